@@ -20,9 +20,14 @@ SHORT 진입 조건:
 - 손절: 최근 50봉 최고가
 """
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from datetime import datetime
+import pyarrow.feather as feather
+from numba import njit
 
 
 # ============================================
@@ -73,6 +78,20 @@ fee_protection = True  # 수수료 보호 기능 활성화 여부
 START_DATE = '2019-02-05'
 END_DATE = '2026-02-20'
 
+# CSV 파싱 결과를 Arrow IPC(feather) 파일로 캐시 (CSV 보다 새로우면 재사용)
+DATA_CACHE_ENABLED = True
+
+# ============================================
+# 파라미터 스윕 설정
+# ============================================
+SWEEP_ENABLED = False   # True 면 단일 백테스트 대신 SWEEP_GRID 전 조합을 병렬 실행
+SWEEP_WORKERS = None    # None = CPU 코어 수
+SWEEP_GRID = {
+    'TP_ATR_MULT_LONG': [3.5, 4.1, 4.7],
+    'TP_ATR_MULT_SHORT': [3.5, 4.1, 4.7],
+    'RISK_PER_TRADE': [0.05, 0.07],
+}
+
 
 # ============================================
 # TradingView 호환 지표 계산 함수
@@ -91,8 +110,13 @@ def calculate_rma(series: pd.Series, length: int) -> pd.Series:
 
     if len(series) >= length:
         result[length - 1] = series.iloc[:length].mean()
-        for i in range(length, len(series)):
-            result[i] = alpha * series.iloc[i] + (1 - alpha) * result[i - 1]
+        # 루프 안에서 series.iloc / 속성 조회 반복하지 않도록 로컬 배열/상수로 끌어올림
+        values = series.to_numpy(dtype=np.float64)
+        decay = 1 - alpha
+        prev = result[length - 1]
+        for i in range(length, len(values)):
+            prev = alpha * values[i] + decay * prev
+            result[i] = prev
 
     return pd.Series(result, index=series.index)
 
@@ -141,6 +165,217 @@ def calculate_adx(high: pd.Series, low: pd.Series, close: pd.Series, length: int
     return adx
 
 
+# ============================================
+# Numba 시뮬레이션 커널
+# ============================================
+
+# 방향 / 청산 사유는 커널 안에서 int8 코드로 다루고, 리포트 단계에서만 문자열로 변환
+LONG = 1
+SHORT = -1
+
+REASON_NONE = -1
+REASON_LIQ = 0
+REASON_SL = 1
+REASON_TP = 2
+REASON_END = 3
+REASON_NAMES = np.array(['LIQ', 'SL', 'TP', 'END'])
+
+
+@njit(cache=True)
+def _calc_leverage(entry_price, stop_loss, risk_per_trade, max_leverage, sl_fee_rate):
+    """손절 거리 기반 레버리지 계산 (sl_fee_rate: 진입 TAKER + 손절 TAKER = TAKER_FEE * 2)"""
+    sl_distance_pct = abs(entry_price - stop_loss) / entry_price
+    effective_sl = sl_distance_pct + sl_fee_rate
+
+    leverage = risk_per_trade / effective_sl
+    leverage = min(leverage, max_leverage)
+    leverage = max(leverage, 1.0)
+
+    return round(leverage, 2)
+
+
+@njit(cache=True)
+def _run_loop(high, low, close, atr, sl_low, sl_high, long_entry, short_entry,
+              initial_capital, risk_per_trade, max_leverage, max_sl_distance,
+              tp_mult_long, tp_mult_short, fee_offset_rate, sl_fee_rate, maker_fee, taker_fee,
+              withdrawal_enabled, withdrawal_multiplier, withdrawal_ratio):
+    """
+    봉 단위 상태머신: 진입 → 청산(LIQ > SL > TP) → 출금 체크
+    direction: LONG/SHORT, reason: REASON_* 코드 (int8)
+    fee_offset_rate / sl_fee_rate 는 run() 에서 미리 계산한 수수료 상수
+
+    Returns: (trades, withdrawals_out, capital, base_capital, total_withdrawn)
+      trades: 컬럼별 배열 튜플 (entry_idx, exit_idx, direction, entry_price, exit_price,
+              take_profit, stop_loss, leverage, size, reason, pnl, balance)
+      withdrawals_out 컬럼: exit_idx, base_capital, balance_before, withdrawn, balance_after, total_withdrawn
+    """
+    n = len(close)
+
+    # 거래 기록: 진입봉 다음 봉부터 청산되므로 최대 n // 2 건 (SoA 로 미리 할당)
+    max_trades = n // 2 + 1
+    tr_entry_idx = np.empty(max_trades, dtype=np.int64)
+    tr_exit_idx = np.empty(max_trades, dtype=np.int64)
+    tr_direction = np.empty(max_trades, dtype=np.int8)
+    tr_entry_price = np.empty(max_trades)
+    tr_exit_price = np.empty(max_trades)
+    tr_take_profit = np.empty(max_trades)
+    tr_stop_loss = np.empty(max_trades)
+    tr_leverage = np.empty(max_trades)
+    tr_size = np.empty(max_trades)
+    tr_reason = np.empty(max_trades, dtype=np.int8)
+    tr_pnl = np.empty(max_trades)
+    tr_balance = np.empty(max_trades)
+    withdrawals_out = np.empty((max_trades, 6))
+    n_trades = 0
+    n_wd = 0
+
+    capital = initial_capital
+    base_capital = initial_capital
+    total_withdrawn = 0.0
+
+    position = 0
+    entry_idx = 0
+    entry_price = 0.0
+    entry_size = 0.0
+    take_profit = 0.0
+    stop_loss = 0.0
+    leverage = 1.0
+    liq_price = 0.0
+
+    for idx in range(1, n + 1):
+        exit_price = 0.0
+        reason = REASON_NONE
+
+        if idx == n:
+            # 백테스트 종료 시 열린 포지션은 마지막 close 로 처리
+            if position == 0:
+                break
+            exit_price = close[n - 1]
+            reason = REASON_END
+        elif position != 0:
+            # 진입은 elif 분기라 청산 체크는 항상 진입 다음 봉부터 (진입봉 체크 없음)
+            # position(+1/-1) 를 부호로 써서 LONG/SHORT 를 한 경로로 판정
+            # adverse: 손실 방향 극값 (LONG=저가, SHORT=고가), favorable: 이익 방향 극값
+            if position == LONG:
+                adverse = low[idx]
+                favorable = high[idx]
+            else:
+                adverse = high[idx]
+                favorable = low[idx]
+
+            if position * adverse <= position * liq_price:
+                exit_price = liq_price
+                reason = REASON_LIQ
+            elif position * adverse <= position * stop_loss:
+                exit_price = stop_loss
+                reason = REASON_SL
+            elif position * favorable >= position * take_profit:
+                exit_price = take_profit
+                reason = REASON_TP
+        elif long_entry[idx] or short_entry[idx]:
+            position = LONG if long_entry[idx] else SHORT
+            entry_price = close[idx]
+            entry_idx = idx
+
+            # 익절가 설정 (ATR 기반 + 진입 수수료 보전 x2, 보호 OFF 면 fee_offset_rate = 0)
+            fee_offset = entry_price * fee_offset_rate
+
+            if position == LONG:
+                take_profit = entry_price + atr[idx] * tp_mult_long + fee_offset
+                stop_loss = sl_low[idx]
+            else:
+                take_profit = entry_price - atr[idx] * tp_mult_short - fee_offset
+                stop_loss = sl_high[idx]
+
+            # SL 거리 캡
+            sl_distance = abs(entry_price - stop_loss) / entry_price
+            if sl_distance > max_sl_distance:
+                stop_loss = entry_price * (1 - position * max_sl_distance)
+
+            leverage = _calc_leverage(entry_price, stop_loss, risk_per_trade, max_leverage, sl_fee_rate)
+            position_value = capital * leverage
+            entry_size = position_value / entry_price
+
+            # 청산가는 포지션 동안 고정 → 봉마다 재계산하지 않고 진입 시 한 번만 계산
+            # 예: 20배 → 5% 역행 시 청산
+            liq_distance = 1.0 / leverage
+            liq_price = entry_price * (1 - position * liq_distance)
+
+        if reason == REASON_NONE:
+            continue
+
+        # 청산 실행
+        pnl = position * (exit_price - entry_price) * entry_size
+
+        # 수수료: 진입(TAKER) + 청산(SL/LIQ=TAKER, TP/END=MAKER)
+        entry_fee = entry_price * entry_size * taker_fee
+        if reason == REASON_SL or reason == REASON_LIQ:
+            exit_fee = exit_price * entry_size * taker_fee
+        else:
+            exit_fee = exit_price * entry_size * maker_fee
+
+        total_fee = entry_fee + exit_fee
+        net_pnl = pnl - total_fee
+        capital += net_pnl
+
+        exit_idx = min(idx, n - 1)
+        k = n_trades
+        tr_entry_idx[k] = entry_idx
+        tr_exit_idx[k] = exit_idx
+        tr_direction[k] = position
+        tr_entry_price[k] = entry_price
+        tr_exit_price[k] = exit_price
+        tr_take_profit[k] = take_profit
+        tr_stop_loss[k] = stop_loss
+        tr_leverage[k] = leverage
+        tr_size[k] = entry_size
+        tr_reason[k] = reason
+        tr_pnl[k] = net_pnl
+        tr_balance[k] = capital
+        n_trades += 1
+        position = 0
+
+        # 출금 체크: 기준자금의 N배 도달 시 WITHDRAWAL_RATIO 만큼 출금 (END 제외)
+        if withdrawal_enabled and reason != REASON_END:
+            target = base_capital * withdrawal_multiplier
+            if capital >= target:
+                withdraw_amount = capital * withdrawal_ratio
+                capital -= withdraw_amount
+                total_withdrawn += withdraw_amount
+
+                wd = withdrawals_out[n_wd]
+                wd[0] = exit_idx
+                wd[1] = base_capital
+                wd[2] = capital + withdraw_amount
+                wd[3] = withdraw_amount
+                wd[4] = capital
+                wd[5] = total_withdrawn
+                n_wd += 1
+
+                # 남은 금액을 새 기준자금으로 설정
+                base_capital = capital
+
+    k = n_trades
+    trades = (tr_entry_idx[:k], tr_exit_idx[:k], tr_direction[:k], tr_entry_price[:k],
+              tr_exit_price[:k], tr_take_profit[:k], tr_stop_loss[:k], tr_leverage[:k],
+              tr_size[:k], tr_reason[:k], tr_pnl[:k], tr_balance[:k])
+    return trades, withdrawals_out[:n_wd], capital, base_capital, total_withdrawn
+
+
+@njit(cache=True)
+def calculate_mdd(balance: np.ndarray, initial_capital: float) -> float:
+    """거래별 잔고 기준 최대 낙폭 (initial_capital 을 초기 고점으로 사용, 비율)"""
+    peak = initial_capital
+    max_drawdown = 0.0
+    for b in balance:
+        if b > peak:
+            peak = b
+        drawdown = (peak - b) / peak
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+    return max_drawdown
+
+
 # ============================================
 # 백테스터 클래스
 # ============================================
@@ -149,22 +384,12 @@ class HyperScalperBacktester:
     def __init__(self, df: pd.DataFrame):
         self.df = df.copy()
         self.capital = INITIAL_CAPITAL
-        self.trades = []
-
-        # 포지션 상태
-        self.position = None
-        self.entry_price = None
-        self.entry_time = None
-        self.entry_idx = None
-        self.entry_size = None
-        self.take_profit = None
-        self.stop_loss = None
-        self.leverage = None
+        self.trades = pd.DataFrame()
 
         # 출금 추적
         self.base_capital = INITIAL_CAPITAL  # 현재 사이클 기준 자금
         self.total_withdrawn = 0.0           # 총 출금액
-        self.withdrawals = []                # 출금 기록
+        self.withdrawals = pd.DataFrame()    # 출금 기록
 
         # 지표 계산
         self._calculate_indicators()
@@ -223,220 +448,81 @@ class HyperScalperBacktester:
             self.df['reclaim_short']
         )
 
-    def calculate_leverage(self, entry_price: float, stop_loss: float) -> float:
-        """손절 거리 기반 레버리지 계산"""
-        sl_distance_pct = abs(entry_price - stop_loss) / entry_price
-
-        # 진입 수수료(TAKER) + 손절 수수료(TAKER) 포함
-        effective_sl = sl_distance_pct + TAKER_FEE * 2
-
-        leverage = RISK_PER_TRADE / effective_sl
-        leverage = min(leverage, MAX_LEVERAGE)
-        leverage = max(leverage, 1)
-
-        return round(leverage, 2)
-
-    def execute_entry(self, idx: int, direction: str):
-        """진입 실행"""
-        row = self.df.iloc[idx]
-
-        self.entry_price = row['close']
-        self.entry_time = row['timestamp']
-        self.entry_idx = idx
-        self.position = direction
-
-        # 익절가 설정 (ATR 기반 + 진입 수수료 보전 x2)
-        fee_offset = 0
-        if( fee_protection == True ):
-            fee_offset = self.entry_price * (TAKER_FEE * 2 + MAKER_FEE)
-        else:
-            fee_offset = 0
-
-        if direction == 'LONG':
-            self.take_profit = self.entry_price + row['atr'] * TP_ATR_MULT_LONG + fee_offset
-        else:  # SHORT
-            self.take_profit = self.entry_price - row['atr'] * TP_ATR_MULT_SHORT - fee_offset
-
-        # 손절가 설정: 최근 N봉 최저가(LONG) / 최고가(SHORT)
-        lookback_start = max(0, idx - SL_LOOKBACK)
-        lookback_data = self.df.iloc[lookback_start:idx + 1]
-
-        if direction == 'LONG':
-            self.stop_loss = lookback_data['low'].min()
-        else:  # SHORT
-            self.stop_loss = lookback_data['high'].max()
-
-        # [TEST] SL 거리 3% 캡 - 결과 이상하면 삭제
-        sl_distance = abs(self.entry_price - self.stop_loss) / self.entry_price
-        if sl_distance > MAX_SL_DISTANCE:
-            if direction == 'LONG':
-                self.stop_loss = self.entry_price * (1 - MAX_SL_DISTANCE)
-            else:  # SHORT
-                self.stop_loss = self.entry_price * (1 + MAX_SL_DISTANCE)
-
-        # 레버리지 계산: 손절가와의 거리 기준
-        self.leverage = self.calculate_leverage(self.entry_price, self.stop_loss)
-
-        # 포지션 크기 계산
-        position_value = self.capital * self.leverage
-        self.entry_size = position_value / self.entry_price
-
-    def check_exit(self, idx: int) -> tuple:
-        """
-        청산/손절/익절 체크
-        Returns: (should_exit, exit_price, reason)
-        우선순위: 청산(LIQ) > 손절(SL) > 익절(TP)
-        """
-        row = self.df.iloc[idx]
-
-        # 청산가 계산 (레버리지 기준)
-        # 예: 20배 → 5% 역행 시 청산
-        liq_distance = 1.0 / self.leverage
-
-        if self.position == 'LONG':
-            liq_price = self.entry_price * (1 - liq_distance)
-
-            # 청산 체크 (최우선)
-            if row['low'] <= liq_price:
-                return True, liq_price, 'LIQ'
-            # 손절
-            if row['low'] <= self.stop_loss:
-                return True, self.stop_loss, 'SL'
-            # 익절
-            if row['high'] >= self.take_profit:
-                return True, self.take_profit, 'TP'
-        else:  # SHORT
-            liq_price = self.entry_price * (1 + liq_distance)
-
-            # 청산 체크 (최우선)
-            if row['high'] >= liq_price:
-                return True, liq_price, 'LIQ'
-            # 손절
-            if row['high'] >= self.stop_loss:
-                return True, self.stop_loss, 'SL'
-            # 익절
-            if row['low'] <= self.take_profit:
-                return True, self.take_profit, 'TP'
-
-        return False, None, None
-
-    def execute_exit(self, exit_price: float, reason: str) -> dict:
-        """청산 실행"""
-        if self.position == 'LONG':
-            pnl = (exit_price - self.entry_price) * self.entry_size
-        else:  # SHORT
-            pnl = (self.entry_price - exit_price) * self.entry_size
-
-        # 수수료: 진입(TAKER) + 청산(SL/LIQ=TAKER, TP=MAKER)
-        entry_fee = self.entry_price * self.entry_size * TAKER_FEE
-        if reason in ['SL', 'LIQ']:
-            exit_fee = exit_price * self.entry_size * TAKER_FEE
-        else:
-            exit_fee = exit_price * self.entry_size * MAKER_FEE
-
-        total_fee = entry_fee + exit_fee
-        net_pnl = pnl - total_fee
-        self.capital += net_pnl
-
-        return {
+        # 손절 기준가: 최근 SL_LOOKBACK봉 (현재봉 포함) 최저가 / 최고가
+        self.df['sl_low'] = self.df['low'].rolling(window=SL_LOOKBACK + 1, min_periods=1).min()
+        self.df['sl_high'] = self.df['high'].rolling(window=SL_LOOKBACK + 1, min_periods=1).max()
+
+    def run(self, verbose: bool = True):
+        """백테스트 실행 (verbose=False 면 로그/결과 출력 생략, 스윕용)"""
+        if verbose:
+            print(f"Starting backtest with {len(self.df)} candles")
+            print(f"Initial capital: {INITIAL_CAPITAL} USDT")
+            print("-" * 50)
+
+        # 봉마다 df.iloc[idx] 로 Series 를 만들지 않도록 컬럼을 numpy 배열로 한 번만 추출
+        high = self.df['high'].to_numpy(dtype=np.float64)
+        low = self.df['low'].to_numpy(dtype=np.float64)
+        close = self.df['close'].to_numpy(dtype=np.float64)
+        atr = self.df['atr'].to_numpy(dtype=np.float64)
+        sl_low = self.df['sl_low'].to_numpy(dtype=np.float64)
+        sl_high = self.df['sl_high'].to_numpy(dtype=np.float64)
+
+        # 진입 후보를 봉마다 판정하지 않고 한 번에 마스크로 계산
+        atr_ok = ~np.isnan(atr)
+        long_entry = self.df['long_signal'].to_numpy(dtype=bool) & atr_ok
+        short_entry = self.df['short_signal'].to_numpy(dtype=bool) & atr_ok
+        if TRADE_DIRECTION not in ['BOTH', 'LONG']:
+            long_entry[:] = False
+        if TRADE_DIRECTION not in ['BOTH', 'SHORT']:
+            short_entry[:] = False
+
+        # 실행 동안 고정인 수수료 상수는 여기서 한 번만 계산해 커널에 넘김
+        fee_offset_rate = TAKER_FEE * 2 + MAKER_FEE if fee_protection else 0.0
+        sl_fee_rate = TAKER_FEE * 2
+
+        trades, withdrawals_out, self.capital, self.base_capital, self.total_withdrawn = _run_loop(
+            high, low, close, atr, sl_low, sl_high, long_entry, short_entry,
+            INITIAL_CAPITAL, RISK_PER_TRADE, float(MAX_LEVERAGE), MAX_SL_DISTANCE,
+            TP_ATR_MULT_LONG, TP_ATR_MULT_SHORT, fee_offset_rate, sl_fee_rate, MAKER_FEE, TAKER_FEE,
+            bool(WITHDRAWAL_ENABLED), float(WITHDRAWAL_MULTIPLIER), WITHDRAWAL_RATIO)
+
+        # 거래 기록: 커널의 컬럼 배열로 DataFrame 을 한 번에 구성
+        (entry_idx, exit_idx, direction, entry_price, exit_price, take_profit,
+         stop_loss, leverage, size, reason, pnl, balance) = trades
+        ts_values = self.df['timestamp'].to_numpy()
+        self.trades = pd.DataFrame({
+            'entry_time': ts_values[entry_idx],
+            'exit_time': ts_values[exit_idx],
+            'direction': np.where(direction == LONG, 'LONG', 'SHORT'),
+            'entry_price': entry_price,
             'exit_price': exit_price,
-            'pnl': net_pnl
-        }
-
-    def close_position(self, result: dict, idx: int, reason: str):
-        """포지션 청산 및 거래 기록"""
-        row = self.df.iloc[idx]
-
-        trade = {
-            'entry_time': self.entry_time,
-            'exit_time': row['timestamp'],
-            'direction': self.position,
-            'entry_price': self.entry_price,
-            'exit_price': result['exit_price'],
-            'take_profit': self.take_profit,
-            'stop_loss': self.stop_loss,
-            'leverage': self.leverage,
-            'size': self.entry_size,
-            'reason': reason,
-            'pnl': result['pnl'],
-            'balance': self.capital
-        }
-        self.trades.append(trade)
-
-        # 포지션 초기화
-        self.position = None
-        self.entry_price = None
-        self.entry_time = None
-        self.entry_idx = None
-        self.entry_size = None
-        self.take_profit = None
-        self.stop_loss = None
-        self.leverage = None
-
-    def check_withdrawal(self, timestamp):
-        """출금 체크: 기준자금의 N배 도달 시 절반 출금"""
-        if not WITHDRAWAL_ENABLED:
-            return
-
-        target = self.base_capital * WITHDRAWAL_MULTIPLIER
-        if self.capital >= target:
-            withdraw_amount = self.capital * WITHDRAWAL_RATIO
-            self.capital -= withdraw_amount
-            self.total_withdrawn += withdraw_amount
-
-            self.withdrawals.append({
-                'timestamp': timestamp,
-                'base_capital': self.base_capital,
-                'balance_before': self.capital + withdraw_amount,
-                'withdrawn': withdraw_amount,
-                'balance_after': self.capital,
-                'total_withdrawn': self.total_withdrawn
-            })
-
-            # 남은 금액을 새 기준자금으로 설정
-            self.base_capital = self.capital
-            print(f"[WITHDRAWAL] {timestamp}: {withdraw_amount:.2f} USDT 출금 → 잔액: {self.capital:.2f} USDT (총 출금: {self.total_withdrawn:.2f})")
-
-    def run(self):
-        """백테스트 실행"""
-        print(f"Starting backtest with {len(self.df)} candles")
-        print(f"Initial capital: {INITIAL_CAPITAL} USDT")
-        print("-" * 50)
-
-        for idx in range(1, len(self.df)):
-            row = self.df.iloc[idx]
-
-            # 포지션이 있을 때
-            if self.position is not None:
-                # 진입봉에서는 체크 안함
-                if idx <= self.entry_idx:
-                    continue
-
-                # 손절/익절 체크
-                should_exit, exit_price, reason = self.check_exit(idx)
-                if should_exit:
-                    result = self.execute_exit(exit_price, reason)
-                    self.close_position(result, idx, reason)
-                    self.check_withdrawal(row['timestamp'])
-                    continue
-
-            # 포지션이 없을 때 진입 확인
-            else:
-                if row['long_signal'] and not pd.isna(row['atr']):
-                    if TRADE_DIRECTION in ['BOTH', 'LONG']:
-                        self.execute_entry(idx, 'LONG')
-                elif row['short_signal'] and not pd.isna(row['atr']):
-                    if TRADE_DIRECTION in ['BOTH', 'SHORT']:
-                        self.execute_entry(idx, 'SHORT')
-
-        # 백테스트 종료 시 열린 포지션 처리
-        if self.position is not None:
-            last_row = self.df.iloc[-1]
-            exit_price = last_row['close']
-            result = self.execute_exit(exit_price, 'END')
-            self.close_position(result, len(self.df) - 1, 'END')
-
-        self._print_results()
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'leverage': leverage,
+            'size': size,
+            'reason': REASON_NAMES[reason],
+            'pnl': pnl,
+            'balance': balance
+        })
+
+        # 출금 기록도 행 dict 없이 컬럼 배열로 구성
+        self.withdrawals = pd.DataFrame({
+            'timestamp': ts_values[withdrawals_out[:, 0].astype(np.int64)],
+            'base_capital': withdrawals_out[:, 1],
+            'balance_before': withdrawals_out[:, 2],
+            'withdrawn': withdrawals_out[:, 3],
+            'balance_after': withdrawals_out[:, 4],
+            'total_withdrawn': withdrawals_out[:, 5]
+        })
+
+        if verbose:
+            for timestamp, withdrawn, after, total in zip(
+                    self.withdrawals['timestamp'], withdrawals_out[:, 3],
+                    withdrawals_out[:, 4], withdrawals_out[:, 5]):
+                print(f"[WITHDRAWAL] {timestamp}: {withdrawn:.2f} USDT 출금 → 잔액: {after:.2f} USDT (총 출금: {total:.2f})")
+
+        if verbose:
+            self._print_results()
         return self.trades
 
     def _print_results(self):
@@ -445,52 +531,49 @@ class HyperScalperBacktester:
         print("BACKTEST RESULTS")
         print("=" * 50)
 
-        total_trades = len(self.trades)
-        wins = [t for t in self.trades if t['pnl'] > 0]
-        losses = [t for t in self.trades if t['pnl'] <= 0]
-        total_pnl = sum(t['pnl'] for t in self.trades)
-
-        # LONG/SHORT 분리
-        long_trades = [t for t in self.trades if t['direction'] == 'LONG']
-        short_trades = [t for t in self.trades if t['direction'] == 'SHORT']
-        long_wins = [t for t in long_trades if t['pnl'] > 0]
-        short_wins = [t for t in short_trades if t['pnl'] > 0]
+        trades = self.trades
+        total_trades = len(trades)
+
+        # 필터링된 Series 를 반복 생성하지 않도록 마스크를 한 번만 계산해 재사용
+        pnl = trades['pnl'].to_numpy()
+        is_win = pnl > 0
+        is_long = (trades['direction'] == 'LONG').to_numpy()
+        is_short = ~is_long
+        n_wins = int(is_win.sum())
+        n_long = int(is_long.sum())
+        n_short = total_trades - n_long
+        n_long_wins = int((is_win & is_long).sum())
+        n_short_wins = n_wins - n_long_wins
+        total_pnl = pnl.sum()
 
         # 청산(LIQ) 횟수
-        liquidations = [t for t in self.trades if t['reason'] == 'LIQ']
+        n_liquidations = int((trades['reason'] == 'LIQ').sum())
 
         print(f"Total Trades: {total_trades}")
-        print(f"  - Long: {len(long_trades)} (Win: {len(long_wins)})")
-        print(f"  - Short: {len(short_trades)} (Win: {len(short_wins)})")
-        print(f"Wins: {len(wins)}")
-        print(f"Losses: {len(losses)}")
-        if len(liquidations) > 0:
-            print(f"Liquidations: {len(liquidations)} (!!)")
+        print(f"  - Long: {n_long} (Win: {n_long_wins})")
+        print(f"  - Short: {n_short} (Win: {n_short_wins})")
+        print(f"Wins: {n_wins}")
+        print(f"Losses: {total_trades - n_wins}")
+        if n_liquidations > 0:
+            print(f"Liquidations: {n_liquidations} (!!)")
 
         if total_trades > 0:
-            win_rate = len(wins) / total_trades * 100
+            win_rate = n_wins / total_trades * 100
             print(f"Win Rate: {win_rate:.2f}%")
 
-        if len(long_trades) > 0:
-            long_win_rate = len(long_wins) / len(long_trades) * 100
-            long_pnl = sum(t['pnl'] for t in long_trades)
+        if n_long > 0:
+            long_win_rate = n_long_wins / n_long * 100
+            long_pnl = pnl[is_long].sum()
             print(f"  - Long Win Rate: {long_win_rate:.2f}%, PnL: {long_pnl:.2f} USDT")
 
-        if len(short_trades) > 0:
-            short_win_rate = len(short_wins) / len(short_trades) * 100
-            short_pnl = sum(t['pnl'] for t in short_trades)
+        if n_short > 0:
+            short_win_rate = n_short_wins / n_short * 100
+            short_pnl = pnl[is_short].sum()
             print(f"  - Short Win Rate: {short_win_rate:.2f}%, PnL: {short_pnl:.2f} USDT")
 
         # MDD 계산
         if total_trades > 0:
-            peak = INITIAL_CAPITAL
-            max_drawdown = 0
-            for t in self.trades:
-                if t['balance'] > peak:
-                    peak = t['balance']
-                drawdown = (peak - t['balance']) / peak
-                if drawdown > max_drawdown:
-                    max_drawdown = drawdown
+            max_drawdown = calculate_mdd(trades['balance'].to_numpy(), INITIAL_CAPITAL)
             print(f"\nMDD: {max_drawdown * 100:.2f}%")
 
         print(f"Total PnL: {total_pnl:.2f} USDT")
@@ -507,12 +590,11 @@ class HyperScalperBacktester:
 
     def save_trades(self, filename: str):
         """거래 내역 CSV 저장"""
-        if not self.trades:
+        if self.trades.empty:
             print("No trades to save")
             return
 
-        df = pd.DataFrame(self.trades)
-        df.to_csv(filename, index=False)
+        self.trades.to_csv(filename, index=False)
         print(f"Trades saved to {filename}")
 
     def save_data_with_indicators(self, filename: str):
@@ -524,37 +606,125 @@ class HyperScalperBacktester:
 
 
 # ============================================
-# 메인 실행
+# 데이터 로드 / 파라미터 스윕
 # ============================================
 
-if __name__ == "__main__":
-    # 데이터 로드
-    print("Loading data...")
-    df = pd.read_csv('historical_data/BTCUSDT_15m_raw.csv')
+def load_data(path: str, start_date: str = START_DATE, end_date: str = END_DATE,
+              verbose: bool = True) -> pd.DataFrame:
+    """OHLCV CSV 로드 후 백테스트 기간으로 슬라이스"""
+    if verbose:
+        print("Loading data...")
+
+    # 컬럼명 소문자화 / timestamp 변환까지 끝낸 데이터를 feather 캐시 (임시 파일에 쓴 뒤 os.replace)
+    cache_path = os.path.splitext(path)[0] + '.feather'
+    if (DATA_CACHE_ENABLED and os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        df = feather.read_table(cache_path, memory_map=True).to_pandas()
+    else:
+        df = pd.read_csv(path, engine='pyarrow')
+        df.columns = df.columns.str.lower()
+        if 'timestamp' not in df.columns and 'open_time' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
+        elif 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if DATA_CACHE_ENABLED:
+            tmp_path = cache_path + '.tmp'
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, cache_path)
+
+    if verbose:
+        print(f"Full data: {len(df)} candles")
+        print(f"Full date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
+
+    # 기간 필터링: timestamp 오름차순이므로 이진 탐색으로 슬라이스 경계 계산 (bool 마스크 생략)
+    ts = df['timestamp'].to_numpy()
+    start_idx = np.searchsorted(ts, np.datetime64(start_date), side='left')
+    end_idx = np.searchsorted(ts, np.datetime64(end_date), side='right')
+    df = df.iloc[start_idx:end_idx].reset_index(drop=True)
+
+    if verbose:
+        print(f"\nFiltered data: {len(df)} candles")
+        print(f"Backtest period: {start_date} to {end_date}")
+
+    return df
+
+
+# 스윕 워커 프로세스별 데이터 (워커 시작 시 한 번만 로드)
+_sweep_df = None
+
+
+def _init_sweep_worker(path: str, start_date: str, end_date: str):
+    global _sweep_df
+    _sweep_df = load_data(path, start_date, end_date, verbose=False)
+
+
+def run_one(params: dict) -> dict:
+    """파라미터 조합 하나로 백테스트 실행 후 요약 지표 반환 (스윕 워커에서 호출)"""
+    # 파라미터는 모듈 상수로 읽으므로 워커 프로세스의 전역값을 덮어씀
+    globals().update(params)
+
+    backtester = HyperScalperBacktester(_sweep_df)
+    trades = backtester.run(verbose=False)
+
+    total_trades = len(trades)
+    wins = int(np.count_nonzero(trades['pnl'].to_numpy() > 0))
+    return {
+        **params,
+        'trades': total_trades,
+        'win_rate': wins / total_trades * 100 if total_trades > 0 else 0.0,
+        'total_pnl': trades['pnl'].sum(),
+        'final_capital': backtester.capital,
+        'return_pct': (backtester.capital / INITIAL_CAPITAL - 1) * 100,
+        'mdd_pct': calculate_mdd(trades['balance'].to_numpy(), INITIAL_CAPITAL) * 100,
+    }
+
+
+def run_sweep(grid: dict, path: str, start_date: str = START_DATE, end_date: str = END_DATE,
+              max_workers: int = None) -> pd.DataFrame:
+    """
+    grid 의 모든 파라미터 조합을 프로세스 풀로 병렬 실행
+    단일 백테스트는 경로 의존이라 순차지만, 조합끼리는 서로 독립
+    """
+    # run_one 이 grid 키로 모듈 전역을 덮어쓰므로 기존 설정 상수가 아닌 키(오타 등)는 미리 거부
+    unknown = [k for k in grid if not isinstance(globals().get(k), (bool, int, float, str))]
+    if unknown:
+        raise ValueError(f"스윕은 모듈 설정 상수만 지원: {sorted(unknown)}")
 
-    # 컬럼명 소문자로 변환
-    df.columns = df.columns.str.lower()
+    keys = list(grid.keys())
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    print(f"Sweep: {len(combos)} combinations")
 
-    # timestamp 컬럼 처리
-    if 'timestamp' not in df.columns and 'open_time' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
-    elif 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    # 워커들이 CSV 를 각자 파싱하지 않도록 캐시를 미리 만들어 둠
+    if DATA_CACHE_ENABLED:
+        load_data(path, start_date, end_date, verbose=False)
 
-    print(f"Full data: {len(df)} candles")
-    print(f"Full date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                             initargs=(path, start_date, end_date)) as executor:
+        results = list(executor.map(run_one, combos))
 
-    # 기간 필터링
-    df = df[(df['timestamp'] >= START_DATE) & (df['timestamp'] <= END_DATE)]
-    df = df.reset_index(drop=True)
+    return pd.DataFrame(results).sort_values('return_pct', ascending=False).reset_index(drop=True)
 
-    print(f"\nFiltered data: {len(df)} candles")
-    print(f"Backtest period: {START_DATE} to {END_DATE}")
 
-    # 백테스터 실행
-    backtester = HyperScalperBacktester(df)
-    trades = backtester.run()
+# ============================================
+# 메인 실행
+# ============================================
 
-    # 결과 저장
-    backtester.save_trades('trades_hyper_scalper_v2.csv')
-    backtester.save_data_with_indicators('data_with_hyper_scalper_v2.csv')
+if __name__ == "__main__":
+    data_path = 'historical_data/BTCUSDT_15m_raw.csv'
+
+    if SWEEP_ENABLED:
+        results = run_sweep(SWEEP_GRID, data_path, max_workers=SWEEP_WORKERS)
+        print(results.to_string())
+        results.to_csv('sweep_hyper_scalper_v2.csv', index=False)
+        print("Sweep results saved to sweep_hyper_scalper_v2.csv")
+    else:
+        # 데이터 로드
+        df = load_data(data_path)
+
+        # 백테스터 실행
+        backtester = HyperScalperBacktester(df)
+        trades = backtester.run()
+
+        # 결과 저장
+        backtester.save_trades('trades_hyper_scalper_v2.csv')
+        backtester.save_data_with_indicators('data_with_hyper_scalper_v2.csv')
@@ -20,9 +20,15 @@ SHORT 진입 조건:
 - 손절: 최근 SL_LOOKBACK봉 최고가
 """
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
+import pyarrow.feather as feather
 from datetime import datetime
+from numba import njit, prange
 
 
 # ============================================
@@ -70,6 +76,23 @@ fee_protection = True
 START_DATE = '2019-01-01'
 END_DATE = '2026-03-05'
 
+# 파싱한 CSV 를 Arrow IPC(feather) 로 캐시, CSV 가 더 새로우면 다시 만듦
+DATA_CACHE_ENABLED = True
+
+# ============================================
+# 파라미터 스윕 설정
+# ============================================
+SWEEP_ENABLED = False   # True: SWEEP_GRID 의 모든 조합을 병렬로 실행
+# 'process': 조합마다 지표부터 다시 계산 (모든 파라미터 가능, ProcessPoolExecutor)
+# 'kernel' : 지표/신호는 한 번만 계산하고 커널만 prange 로 병렬 실행 (KERNEL_SWEEP_PARAMS 만 가능)
+SWEEP_MODE = 'process'
+SWEEP_WORKERS = None    # None = CPU 코어 수 ('process' 모드)
+SWEEP_GRID = {
+    'ADX_THRESHOLD': [40.0, 50.0],
+    'TP_ATR_MULT': [5.0, 7.0, 9.0],
+    'SL_LOOKBACK': [30, 50],
+}
+
 
 # ============================================
 # TradingView 호환 지표 계산 함수
@@ -85,8 +108,13 @@ def calculate_rma(series: pd.Series, length: int) -> pd.Series:
     result[:] = np.nan
     if len(series) >= length:
         result[length - 1] = series.iloc[:length].mean()
-        for i in range(length, len(series)):
-            result[i] = alpha * series.iloc[i] + (1 - alpha) * result[i - 1]
+        # 바 단위 series.iloc 스칼라 조회 대신 ndarray 인덱싱
+        values = series.to_numpy(dtype=np.float64)
+        decay = 1 - alpha
+        prev = result[length - 1]
+        for i in range(length, len(values)):
+            prev = alpha * values[i] + decay * prev
+            result[i] = prev
     return pd.Series(result, index=series.index)
 
 
@@ -138,64 +166,311 @@ def calculate_rsi(close: pd.Series, length: int) -> pd.Series:
 def calculate_stoch_rsi(close: pd.Series, rsi_len: int, stoch_len: int,
                          k_smooth: int, d_smooth: int) -> tuple:
     rsi = calculate_rsi(close, rsi_len)
-    stoch_k_raw = pd.Series(np.nan, index=close.index)
-    for i in range(stoch_len - 1, len(rsi)):
-        window = rsi.iloc[i - stoch_len + 1:i + 1]
-        lo = window.min()
-        hi = window.max()
-        if hi - lo > 0:
-            stoch_k_raw.iloc[i] = (rsi.iloc[i] - lo) / (hi - lo) * 100
-        else:
-            stoch_k_raw.iloc[i] = 50.0
+    # 봉마다 윈도우를 슬라이스하지 않고 rolling min/max (단조 deque, O(N)) 로 한 번에 계산
+    lo = rsi.rolling(stoch_len).min()
+    hi = rsi.rolling(stoch_len).max()
+    rng = hi - lo
+    stoch_k_raw = ((rsi - lo) / rng * 100).where(rng > 0, 50.0).where(lo.notna())
     k = stoch_k_raw.rolling(k_smooth, min_periods=1).mean()
     d = k.rolling(d_smooth, min_periods=1).mean()
     return k, d
 
 
-def calculate_vwap(df: pd.DataFrame) -> pd.Series:
-    tp = (df['high'] + df['low'] + df['close']) / 3.0
-    n = len(df)
+@njit(cache=True)
+def _vwap_loop(tp, volume, day_ids):
+    n = len(tp)
     vwap = np.full(n, np.nan)
     cum_tpv = 0.0
     cum_v = 0.0
     prev_day = -1
-    ts_int = df['timestamp'].values.astype(np.int64)
-
     for i in range(n):
-        day = ts_int[i] // (86400 * 10**9) if ts_int[i] > 10**15 else ts_int[i] // 86400
+        day = day_ids[i]
         if day != prev_day:
             cum_tpv = 0.0
             cum_v = 0.0
             prev_day = day
-        cum_tpv += tp.iloc[i] * df['volume'].iloc[i]
-        cum_v += df['volume'].iloc[i]
-        vwap[i] = cum_tpv / cum_v if cum_v > 0 else tp.iloc[i]
+        cum_tpv += tp[i] * volume[i]
+        cum_v += volume[i]
+        vwap[i] = cum_tpv / cum_v if cum_v > 0 else tp[i]
+    return vwap
+
 
+def calculate_vwap(df: pd.DataFrame) -> pd.Series:
+    tp = (df['high'] + df['low'] + df['close']) / 3.0
+    # 일 단위 키: datetime64 해상도(s/ms/us/ns)와 무관하게 UTC 날짜 번호(int64)로 변환해
+    # 커널에는 timestamp 객체 대신 정수 배열만 넘김
+    day_ids = df['timestamp'].values.astype('datetime64[D]').view(np.int64)
+    vwap = _vwap_loop(tp.to_numpy(dtype=np.float64), df['volume'].to_numpy(dtype=np.float64), day_ids)
     return pd.Series(vwap, index=df.index)
 
 
+# ============================================
+# Numba 시뮬레이션 커널
+# ============================================
+
+# 방향 / 청산 사유 코드 (커널과 거래 기록에서 int8 로 사용, 문자열은 DataFrame 구성 시에만)
+LONG, SHORT = 1, -1
+REASON_NONE, REASON_LIQ, REASON_SL, REASON_TP, REASON_END = -1, 0, 1, 2, 3
+REASON_NAMES = np.array(['LIQ', 'SL', 'TP', 'END'])
+
+
+def _fee_rates():
+    """커널에 넘길 수수료 상수 (fee_offset_rate, sl_fee_rate) — 봉/거래마다 다시 계산하지 않음"""
+    fee_offset_rate = TAKER_FEE * 2 + MAKER_FEE if fee_protection else 0.0
+    return fee_offset_rate, TAKER_FEE * 2
+
+
+@njit(cache=True)
+def _calc_leverage(entry_price, stop_loss, risk_per_trade, max_leverage, sl_fee_rate):
+    # sl_fee_rate: 진입 TAKER + 손절 TAKER = TAKER_FEE * 2
+    effective_sl = abs(entry_price - stop_loss) / entry_price + sl_fee_rate
+    # [1, max_leverage] 클램프를 한 식으로 (min/max 는 분기 없이 select 로 컴파일됨)
+    return round(max(min(risk_per_trade / effective_sl, max_leverage), 1.0), 2)
+
+
+@njit(cache=True)
+def _run_loop(high, low, close, atr, sl_low, sl_high, entry_dir, start_idx,
+              initial_capital, risk_per_trade, max_leverage, max_sl_distance, tp_atr_mult,
+              fee_offset_rate, sl_fee_rate, maker_fee, taker_fee,
+              withdrawal_enabled, withdrawal_multiplier, withdrawal_ratio):
+    """
+    봉 단위 상태머신 (진입 → LIQ/SL/TP 청산 → 출금), 포지션 상태는 로컬 스칼라로 유지
+    direction: LONG/SHORT, reason: REASON_* (둘 다 int8 로 기록)
+    fee_offset_rate / sl_fee_rate 는 _fee_rates() 로 미리 계산한 수수료 상수
+
+    Returns: (trades, withdrawals_out, capital, base_capital, total_withdrawn)
+      trades: 컬럼별 배열 튜플 (entry_idx, exit_idx, direction, entry_price, exit_price,
+              take_profit, stop_loss, leverage, size, reason, pnl, balance)
+      withdrawals_out 컬럼: exit_idx, base_capital, balance_before, withdrawn, balance_after, total_withdrawn
+    """
+    n = len(close)
+
+    # 진입 다음 봉부터 청산되므로 거래 수는 최대 n // 2 + 1
+    max_trades = n // 2 + 1
+    tr_entry_idx = np.empty(max_trades, dtype=np.int64)
+    tr_exit_idx = np.empty(max_trades, dtype=np.int64)
+    tr_direction = np.empty(max_trades, dtype=np.int8)
+    tr_entry_price = np.empty(max_trades)
+    tr_exit_price = np.empty(max_trades)
+    tr_take_profit = np.empty(max_trades)
+    tr_stop_loss = np.empty(max_trades)
+    tr_leverage = np.empty(max_trades)
+    tr_size = np.empty(max_trades)
+    tr_reason = np.empty(max_trades, dtype=np.int8)
+    tr_pnl = np.empty(max_trades)
+    tr_balance = np.empty(max_trades)
+    withdrawals_out = np.empty((max_trades, 6))
+    n_trades = 0
+    n_wd = 0
+
+    capital = initial_capital
+    base_capital = initial_capital
+    total_withdrawn = 0.0
+
+    position = 0
+    entry_idx = 0
+    entry_price = 0.0
+    entry_size = 0.0
+    take_profit = 0.0
+    stop_loss = 0.0
+    leverage = 1.0
+
+    for idx in range(start_idx, n + 1):
+        exit_price = 0.0
+        reason = REASON_NONE
+
+        if idx == n:
+            # 종료 시 열린 포지션은 마지막 close 로 청산
+            if position == 0:
+                break
+            exit_price = close[n - 1]
+            reason = REASON_END
+        elif position != 0:
+            liq_distance = 1.0 / leverage
+            if position == LONG:
+                liq_price = entry_price * (1 - liq_distance)
+                if low[idx] <= liq_price:
+                    exit_price = liq_price
+                    reason = REASON_LIQ
+                elif low[idx] <= stop_loss:
+                    exit_price = stop_loss
+                    reason = REASON_SL
+                elif high[idx] >= take_profit:
+                    exit_price = take_profit
+                    reason = REASON_TP
+            else:
+                liq_price = entry_price * (1 + liq_distance)
+                if high[idx] >= liq_price:
+                    exit_price = liq_price
+                    reason = REASON_LIQ
+                elif high[idx] >= stop_loss:
+                    exit_price = stop_loss
+                    reason = REASON_SL
+                elif low[idx] <= take_profit:
+                    exit_price = take_profit
+                    reason = REASON_TP
+        else:
+            # 무포지션 상태의 다음 상태는 진입 방향 테이블(LONG/SHORT/0)에서 바로 읽음
+            position = entry_dir[idx]
+            if position == 0:
+                continue
+
+            entry_price = close[idx]
+            entry_idx = idx
+
+            # 수수료 보전 (보호 OFF 면 fee_offset_rate = 0)
+            fee_offset = entry_price * fee_offset_rate
+
+            if position == LONG:
+                take_profit = entry_price + atr[idx] * tp_atr_mult + fee_offset
+                stop_loss = sl_low[idx]
+                # SL >= entry 방지
+                if stop_loss >= entry_price:
+                    stop_loss = entry_price * (1 - 0.001)
+            else:
+                take_profit = entry_price - atr[idx] * tp_atr_mult - fee_offset
+                stop_loss = sl_high[idx]
+                if stop_loss <= entry_price:
+                    stop_loss = entry_price * (1 + 0.001)
+
+            # SL 거리 캡
+            sl_distance = abs(entry_price - stop_loss) / entry_price
+            if sl_distance > max_sl_distance:
+                if position == LONG:
+                    stop_loss = entry_price * (1 - max_sl_distance)
+                else:
+                    stop_loss = entry_price * (1 + max_sl_distance)
+
+            leverage = _calc_leverage(entry_price, stop_loss, risk_per_trade, max_leverage, sl_fee_rate)
+            position_value = capital * leverage
+            entry_size = position_value / entry_price
+            continue
+
+        if reason == REASON_NONE:
+            continue
+
+        # 청산 실행
+        if position == LONG:
+            pnl = (exit_price - entry_price) * entry_size
+        else:
+            pnl = (entry_price - exit_price) * entry_size
+
+        entry_fee = entry_price * entry_size * taker_fee
+        if reason == REASON_LIQ or reason == REASON_SL:
+            exit_fee = exit_price * entry_size * taker_fee
+        else:
+            exit_fee = exit_price * entry_size * maker_fee
+
+        total_fee = entry_fee + exit_fee
+        net_pnl = pnl - total_fee
+        capital += net_pnl
+
+        exit_idx = min(idx, n - 1)
+        k = n_trades
+        tr_entry_idx[k] = entry_idx
+        tr_exit_idx[k] = exit_idx
+        tr_direction[k] = position
+        tr_entry_price[k] = entry_price
+        tr_exit_price[k] = exit_price
+        tr_take_profit[k] = take_profit
+        tr_stop_loss[k] = stop_loss
+        tr_leverage[k] = leverage
+        tr_size[k] = entry_size
+        tr_reason[k] = reason
+        tr_pnl[k] = net_pnl
+        tr_balance[k] = capital
+        n_trades += 1
+        position = 0
+
+        # 출금 체크 (END 청산 후에는 하지 않음)
+        if withdrawal_enabled and reason != REASON_END:
+            target = base_capital * withdrawal_multiplier
+            if capital >= target:
+                withdraw_amount = capital * withdrawal_ratio
+                capital -= withdraw_amount
+                total_withdrawn += withdraw_amount
+
+                wd = withdrawals_out[n_wd]
+                wd[0] = exit_idx
+                wd[1] = base_capital
+                wd[2] = capital + withdraw_amount
+                wd[3] = withdraw_amount
+                wd[4] = capital
+                wd[5] = total_withdrawn
+                n_wd += 1
+
+                base_capital = capital
+
+    k = n_trades
+    trades = (tr_entry_idx[:k], tr_exit_idx[:k], tr_direction[:k], tr_entry_price[:k],
+              tr_exit_price[:k], tr_take_profit[:k], tr_stop_loss[:k], tr_leverage[:k],
+              tr_size[:k], tr_reason[:k], tr_pnl[:k], tr_balance[:k])
+    return trades, withdrawals_out[:n_wd], capital, base_capital, total_withdrawn
+
+
+@njit(cache=True)
+def calculate_mdd(balance: np.ndarray, initial_capital: float) -> float:
+    """거래별 잔고 기준 최대 낙폭 (시작 고점 = initial_capital). 결과 출력과 _sweep_loop 공용."""
+    peak = initial_capital
+    max_drawdown = 0.0
+    for b in balance:
+        if b > peak:
+            peak = b
+        drawdown = (peak - b) / peak
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+    return max_drawdown
+
+
+@njit(parallel=True, cache=True)
+def _sweep_loop(high, low, close, atr, sl_low, sl_high, entry_dir, start_idx,
+                risks, max_sl_distances, tp_atr_mults,
+                initial_capital, max_leverage, fee_offset_rate, sl_fee_rate, maker_fee, taker_fee,
+                withdrawal_enabled, withdrawal_multiplier, withdrawal_ratio):
+    """
+    같은 가격/신호 배열에 대해 (risk, SL 캡, TP 배수) 조합별로 _run_loop 를 prange 병렬 실행
+    Returns: (final_capital, total_pnl, n_trades, n_wins, mdd) 조합별 배열
+    """
+    n_combos = len(risks)
+    final_capital = np.empty(n_combos)
+    total_pnl = np.empty(n_combos)
+    n_trades = np.empty(n_combos, dtype=np.int64)
+    n_wins = np.empty(n_combos, dtype=np.int64)
+    mdd = np.empty(n_combos)
+
+    for c in prange(n_combos):
+        trades, _, capital, _, _ = _run_loop(
+            high, low, close, atr, sl_low, sl_high, entry_dir, start_idx,
+            initial_capital, risks[c], max_leverage, max_sl_distances[c], tp_atr_mults[c],
+            fee_offset_rate, sl_fee_rate, maker_fee, taker_fee,
+            withdrawal_enabled, withdrawal_multiplier, withdrawal_ratio)
+        pnl = trades[10]
+        balance = trades[11]
+
+        final_capital[c] = capital
+        total_pnl[c] = pnl.sum()
+        n_trades[c] = len(pnl)
+        n_wins[c] = np.sum(pnl > 0)
+        mdd[c] = calculate_mdd(balance, initial_capital)
+
+    return final_capital, total_pnl, n_trades, n_wins, mdd
+
+
 # ============================================
 # 백테스터 클래스
 # ============================================
 
 class StochRsiVwapBacktester:
     def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+        # 기존 컬럼은 읽기만 하고 지표 컬럼만 추가하므로 데이터 전체를 복사할 필요 없음
+        # (얕은 복사: 새 컬럼은 이 객체에만 추가되고, 호출자의 df 는 변경되지 않음)
+        self.df = df.copy(deep=False)
         self.capital = INITIAL_CAPITAL
-        self.trades = []
-
-        self.position = None
-        self.entry_price = None
-        self.entry_time = None
-        self.entry_idx = None
-        self.entry_size = None
-        self.take_profit = None
-        self.stop_loss = None
-        self.leverage = None
+        self.trades = pd.DataFrame()
 
         self.base_capital = INITIAL_CAPITAL
         self.total_withdrawn = 0.0
-        self.withdrawals = []
+        self.withdrawals = pd.DataFrame()
 
         self._calculate_indicators()
 
@@ -210,201 +485,92 @@ class StochRsiVwapBacktester:
         # VWAP
         self.df['vwap'] = calculate_vwap(self.df)
 
+        # 진입 신호: 봉마다 NaN/크로스 조건을 검사하지 않고 한 번에 벡터 연산
+        # (NaN 이 섞인 비교는 False 라서 지표 준비 전 구간은 자동으로 제외됨)
+        k = self.df['stoch_k']
+        d = self.df['stoch_d']
+        k_prev = k.shift(1)
+        d_prev = d.shift(1)
+        tradable = self.df['atr'].notna() & (self.df['adx'] >= ADX_THRESHOLD)
+        self.df['long_signal'] = (tradable &
+                                  (k_prev < d_prev) & (k > d) & (k_prev < OVERSOLD) &
+                                  (self.df['close'] > self.df['vwap']))
+        self.df['short_signal'] = (tradable &
+                                   (k_prev > d_prev) & (k < d) & (k_prev > OVERBOUGHT) &
+                                   (self.df['close'] < self.df['vwap']))
+
         # SL lookback
         self.df['sl_low'] = self.df['low'].rolling(window=SL_LOOKBACK + 1, min_periods=1).min()
         self.df['sl_high'] = self.df['high'].rolling(window=SL_LOOKBACK + 1, min_periods=1).max()
 
-    def calculate_leverage(self, entry_price: float, stop_loss: float) -> float:
-        sl_distance_pct = abs(entry_price - stop_loss) / entry_price
-        effective_sl = sl_distance_pct + TAKER_FEE * 2
-        leverage = RISK_PER_TRADE / effective_sl
-        leverage = min(leverage, MAX_LEVERAGE)
-        leverage = max(leverage, 1)
-        return round(leverage, 2)
-
-    def execute_entry(self, idx: int, direction: str):
-        row = self.df.iloc[idx]
-        self.entry_price = row['close']
-        self.entry_time = row['timestamp']
-        self.entry_idx = idx
-        self.position = direction
-
-        fee_offset = 0
-        if fee_protection:
-            fee_offset = self.entry_price * (TAKER_FEE * 2 + MAKER_FEE)
-
-        if direction == 'LONG':
-            self.take_profit = self.entry_price + row['atr'] * TP_ATR_MULT + fee_offset
-        else:
-            self.take_profit = self.entry_price - row['atr'] * TP_ATR_MULT - fee_offset
-
-        if direction == 'LONG':
-            self.stop_loss = row['sl_low']
-        else:
-            self.stop_loss = row['sl_high']
-
-        # SL >= entry 방지
-        if direction == 'LONG' and self.stop_loss >= self.entry_price:
-            self.stop_loss = self.entry_price * (1 - 0.001)
-        elif direction == 'SHORT' and self.stop_loss <= self.entry_price:
-            self.stop_loss = self.entry_price * (1 + 0.001)
-
-        # SL 거리 캡
-        sl_distance = abs(self.entry_price - self.stop_loss) / self.entry_price
-        if sl_distance > MAX_SL_DISTANCE:
-            if direction == 'LONG':
-                self.stop_loss = self.entry_price * (1 - MAX_SL_DISTANCE)
-            else:
-                self.stop_loss = self.entry_price * (1 + MAX_SL_DISTANCE)
-
-        self.leverage = self.calculate_leverage(self.entry_price, self.stop_loss)
-        position_value = self.capital * self.leverage
-        self.entry_size = position_value / self.entry_price
-
-    def check_exit(self, idx: int) -> tuple:
-        row = self.df.iloc[idx]
-        liq_distance = 1.0 / self.leverage
-
-        if self.position == 'LONG':
-            liq_price = self.entry_price * (1 - liq_distance)
-            if row['low'] <= liq_price:
-                return True, liq_price, 'LIQ'
-            if row['low'] <= self.stop_loss:
-                return True, self.stop_loss, 'SL'
-            if row['high'] >= self.take_profit:
-                return True, self.take_profit, 'TP'
-        else:
-            liq_price = self.entry_price * (1 + liq_distance)
-            if row['high'] >= liq_price:
-                return True, liq_price, 'LIQ'
-            if row['high'] >= self.stop_loss:
-                return True, self.stop_loss, 'SL'
-            if row['low'] <= self.take_profit:
-                return True, self.take_profit, 'TP'
-
-        return False, None, None
-
-    def execute_exit(self, exit_price: float, reason: str) -> dict:
-        if self.position == 'LONG':
-            pnl = (exit_price - self.entry_price) * self.entry_size
-        else:
-            pnl = (self.entry_price - exit_price) * self.entry_size
-
-        entry_fee = self.entry_price * self.entry_size * TAKER_FEE
-        if reason in ['SL', 'LIQ']:
-            exit_fee = exit_price * self.entry_size * TAKER_FEE
-        else:
-            exit_fee = exit_price * self.entry_size * MAKER_FEE
-
-        total_fee = entry_fee + exit_fee
-        net_pnl = pnl - total_fee
-        self.capital += net_pnl
-
-        return {'exit_price': exit_price, 'pnl': net_pnl}
-
-    def close_position(self, result: dict, idx: int, reason: str):
-        row = self.df.iloc[idx]
-        trade = {
-            'entry_time': self.entry_time,
-            'exit_time': row['timestamp'],
-            'direction': self.position,
-            'entry_price': self.entry_price,
-            'exit_price': result['exit_price'],
-            'take_profit': self.take_profit,
-            'stop_loss': self.stop_loss,
-            'leverage': self.leverage,
-            'size': self.entry_size,
-            'reason': reason,
-            'pnl': result['pnl'],
-            'balance': self.capital
-        }
-        self.trades.append(trade)
-
-        self.position = None
-        self.entry_price = None
-        self.entry_time = None
-        self.entry_idx = None
-        self.entry_size = None
-        self.take_profit = None
-        self.stop_loss = None
-        self.leverage = None
-
-    def check_withdrawal(self, timestamp):
-        if not WITHDRAWAL_ENABLED:
-            return
-        target = self.base_capital * WITHDRAWAL_MULTIPLIER
-        if self.capital >= target:
-            withdraw_amount = self.capital * WITHDRAWAL_RATIO
-            self.capital -= withdraw_amount
-            self.total_withdrawn += withdraw_amount
-            self.withdrawals.append({
-                'timestamp': timestamp,
-                'base_capital': self.base_capital,
-                'balance_before': self.capital + withdraw_amount,
-                'withdrawn': withdraw_amount,
-                'balance_after': self.capital,
-                'total_withdrawn': self.total_withdrawn
-            })
-            self.base_capital = self.capital
-            print(f"[WITHDRAWAL] {timestamp}: {withdraw_amount:.2f} USDT 출금 → 잔액: {self.capital:.2f} USDT (총 출금: {self.total_withdrawn:.2f})")
-
-    def run(self):
-        print(f"Starting backtest with {len(self.df)} candles")
-        print(f"Initial capital: {INITIAL_CAPITAL} USDT")
-        print(f"Strategy: StochRSI({RSI_LENGTH},{STOCH_LENGTH},{STOCH_K_SMOOTH},{STOCH_D_SMOOTH}) + VWAP")
-        print(f"Params: ADX>={ADX_THRESHOLD}, TP={TP_ATR_MULT}xATR, SL_LB={SL_LOOKBACK}, RISK={RISK_PER_TRADE*100}%")
-        print(f"Oversold={OVERSOLD}, Overbought={OVERBOUGHT}")
-        print("-" * 50)
-
+    def _kernel_inputs(self) -> tuple:
+        """커널 입력: (가격/지표 배열 리스트, 진입 방향 배열, 시작 인덱스)"""
         start_idx = max(SL_LOOKBACK + 1, RSI_LENGTH + STOCH_LENGTH + 10)
 
-        for idx in range(start_idx, len(self.df)):
-            row = self.df.iloc[idx]
-
-            if self.position is not None:
-                if idx <= self.entry_idx:
-                    continue
-                should_exit, exit_price, reason = self.check_exit(idx)
-                if should_exit:
-                    result = self.execute_exit(exit_price, reason)
-                    self.close_position(result, idx, reason)
-                    self.check_withdrawal(row['timestamp'])
-                    continue
-            else:
-                if pd.isna(row['atr']) or pd.isna(row['adx']) or row['adx'] < ADX_THRESHOLD:
-                    continue
-                if pd.isna(row['stoch_k']) or pd.isna(row['stoch_d']):
-                    continue
-
-                prev = self.df.iloc[idx - 1]
-                if pd.isna(prev['stoch_k']) or pd.isna(prev['stoch_d']):
-                    continue
-                if pd.isna(row['vwap']):
-                    continue
-
-                # LONG: K crosses above D from oversold + price > VWAP
-                long_sig = (prev['stoch_k'] < prev['stoch_d'] and
-                           row['stoch_k'] > row['stoch_d'] and
-                           prev['stoch_k'] < OVERSOLD and
-                           row['close'] > row['vwap'])
-
-                # SHORT: K crosses below D from overbought + price < VWAP
-                short_sig = (prev['stoch_k'] > prev['stoch_d'] and
-                            row['stoch_k'] < row['stoch_d'] and
-                            prev['stoch_k'] > OVERBOUGHT and
-                            row['close'] < row['vwap'])
-
-                if long_sig and TRADE_DIRECTION in ['BOTH', 'LONG']:
-                    self.execute_entry(idx, 'LONG')
-                elif short_sig and TRADE_DIRECTION in ['BOTH', 'SHORT']:
-                    self.execute_entry(idx, 'SHORT')
-
-        if self.position is not None:
-            last_row = self.df.iloc[-1]
-            result = self.execute_exit(last_row['close'], 'END')
-            self.close_position(result, len(self.df) - 1, 'END')
-
-        self._print_results()
+        # 봉마다 df.iloc 로 행 Series 를 만들지 않고, 컬럼 배열을 Numba 커널에 한 번에 넘김
+        cols = ['high', 'low', 'close', 'atr', 'sl_low', 'sl_high']
+        arrays = [self.df[c].to_numpy(dtype=np.float64) for c in cols]
+
+        long_entry = self.df['long_signal'].to_numpy(dtype=bool) & (TRADE_DIRECTION in ['BOTH', 'LONG'])
+        short_entry = self.df['short_signal'].to_numpy(dtype=bool) & (TRADE_DIRECTION in ['BOTH', 'SHORT'])
+        # 봉별 진입 방향 (LONG 우선, 없으면 0) 을 int8 배열 하나로 합쳐 커널의 분기를 줄임
+        entry_dir = np.where(long_entry, LONG, np.where(short_entry, SHORT, 0)).astype(np.int8)
+        return arrays, entry_dir, start_idx
+
+    def run(self, verbose: bool = True):
+        # verbose=False: 로그/결과 출력 없이 거래 기록만 생성 (스윕 등 반복 실행용)
+        if verbose:
+            print(f"Starting backtest with {len(self.df)} candles")
+            print(f"Initial capital: {INITIAL_CAPITAL} USDT")
+            print(f"Strategy: StochRSI({RSI_LENGTH},{STOCH_LENGTH},{STOCH_K_SMOOTH},{STOCH_D_SMOOTH}) + VWAP")
+            print(f"Params: ADX>={ADX_THRESHOLD}, TP={TP_ATR_MULT}xATR, SL_LB={SL_LOOKBACK}, RISK={RISK_PER_TRADE*100}%")
+            print(f"Oversold={OVERSOLD}, Overbought={OVERBOUGHT}")
+            print("-" * 50)
+
+        arrays, entry_dir, start_idx = self._kernel_inputs()
+        trades, withdrawals_out, self.capital, self.base_capital, self.total_withdrawn = _run_loop(
+            *arrays, entry_dir, start_idx,
+            INITIAL_CAPITAL, RISK_PER_TRADE, float(MAX_LEVERAGE), MAX_SL_DISTANCE, float(TP_ATR_MULT),
+            *_fee_rates(), MAKER_FEE, TAKER_FEE,
+            bool(WITHDRAWAL_ENABLED), float(WITHDRAWAL_MULTIPLIER), WITHDRAWAL_RATIO)
+
+        # 거래 기록: 행 dict 를 쌓지 않고 커널의 컬럼 배열로 DataFrame 을 한 번에 구성
+        (entry_idx, exit_idx, direction, entry_price, exit_price, take_profit,
+         stop_loss, leverage, size, reason, pnl, balance) = trades
+        ts_values = self.df['timestamp'].to_numpy()
+        self.trades = pd.DataFrame({
+            'entry_time': ts_values[entry_idx],
+            'exit_time': ts_values[exit_idx],
+            'direction': np.where(direction == LONG, 'LONG', 'SHORT'),
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'leverage': leverage,
+            'size': size,
+            'reason': REASON_NAMES[reason],
+            'pnl': pnl,
+            'balance': balance
+        })
+
+        # 출금 기록도 커널이 채운 (n, 6) 배열에서 컬럼 단위로 구성
+        self.withdrawals = pd.DataFrame({
+            'timestamp': ts_values[withdrawals_out[:, 0].astype(np.int64)],
+            'base_capital': withdrawals_out[:, 1],
+            'balance_before': withdrawals_out[:, 2],
+            'withdrawn': withdrawals_out[:, 3],
+            'balance_after': withdrawals_out[:, 4],
+            'total_withdrawn': withdrawals_out[:, 5]
+        })
+
+        # 출금 로그는 커널 실행 후 한 번에 출력
+        if verbose:
+            for timestamp, withdrawn, balance_after, total_withdrawn in zip(
+                    self.withdrawals['timestamp'], withdrawals_out[:, 3],
+                    withdrawals_out[:, 4], withdrawals_out[:, 5]):
+                print(f"[WITHDRAWAL] {timestamp}: {withdrawn:.2f} USDT 출금 → "
+                      f"잔액: {balance_after:.2f} USDT (총 출금: {total_withdrawn:.2f})")
+            self._print_results()
         return self.trades
 
     def _print_results(self):
@@ -412,48 +578,48 @@ class StochRsiVwapBacktester:
         print("BACKTEST RESULTS")
         print("=" * 50)
 
-        total_trades = len(self.trades)
-        wins = [t for t in self.trades if t['pnl'] > 0]
-        losses = [t for t in self.trades if t['pnl'] <= 0]
-        total_pnl = sum(t['pnl'] for t in self.trades)
-
-        long_trades = [t for t in self.trades if t['direction'] == 'LONG']
-        short_trades = [t for t in self.trades if t['direction'] == 'SHORT']
-        long_wins = [t for t in long_trades if t['pnl'] > 0]
-        short_wins = [t for t in short_trades if t['pnl'] > 0]
-        liquidations = [t for t in self.trades if t['reason'] == 'LIQ']
+        trades = self.trades
+        total_trades = len(trades)
+
+        # pnl 열은 한 번만 꺼내고, 승/방향 마스크 두 개로 모든 집계를 파생
+        pnl = trades['pnl'].to_numpy()
+        win_mask = pnl > 0
+        long_mask = (trades['direction'] == 'LONG').to_numpy()
+        n_wins = int(win_mask.sum())
+        n_long = int(long_mask.sum())
+        n_short = total_trades - n_long
+        n_long_wins = int((win_mask & long_mask).sum())
+        n_short_wins = n_wins - n_long_wins
+        # 청산 사유별 건수는 value_counts 한 번으로 (문자열 비교 마스크를 사유마다 만들지 않음)
+        reason_counts = trades['reason'].value_counts()
+        n_liquidations = int(reason_counts.get('LIQ', 0))
+        # 기존 출력과 같은 순차 합 (np.sum 의 pairwise 합은 큰 값에서 끝자리가 달라짐)
+        total_pnl = sum(pnl.tolist())
 
         print(f"Total Trades: {total_trades}")
-        print(f"  - Long: {len(long_trades)} (Win: {len(long_wins)})")
-        print(f"  - Short: {len(short_trades)} (Win: {len(short_wins)})")
-        print(f"Wins: {len(wins)}")
-        print(f"Losses: {len(losses)}")
-        if len(liquidations) > 0:
-            print(f"Liquidations: {len(liquidations)} (!!)")
+        print(f"  - Long: {n_long} (Win: {n_long_wins})")
+        print(f"  - Short: {n_short} (Win: {n_short_wins})")
+        print(f"Wins: {n_wins}")
+        print(f"Losses: {total_trades - n_wins}")
+        if n_liquidations > 0:
+            print(f"Liquidations: {n_liquidations} (!!)")
 
         if total_trades > 0:
-            win_rate = len(wins) / total_trades * 100
+            win_rate = n_wins / total_trades * 100
             print(f"Win Rate: {win_rate:.2f}%")
 
-        if len(long_trades) > 0:
-            long_win_rate = len(long_wins) / len(long_trades) * 100
-            long_pnl = sum(t['pnl'] for t in long_trades)
+        if n_long > 0:
+            long_win_rate = n_long_wins / n_long * 100
+            long_pnl = sum(pnl[long_mask].tolist())
             print(f"  - Long Win Rate: {long_win_rate:.2f}%, PnL: {long_pnl:.2f} USDT")
 
-        if len(short_trades) > 0:
-            short_win_rate = len(short_wins) / len(short_trades) * 100
-            short_pnl = sum(t['pnl'] for t in short_trades)
+        if n_short > 0:
+            short_win_rate = n_short_wins / n_short * 100
+            short_pnl = sum(pnl[~long_mask].tolist())
             print(f"  - Short Win Rate: {short_win_rate:.2f}%, PnL: {short_pnl:.2f} USDT")
 
         if total_trades > 0:
-            peak = INITIAL_CAPITAL
-            max_drawdown = 0
-            for t in self.trades:
-                if t['balance'] > peak:
-                    peak = t['balance']
-                drawdown = (peak - t['balance']) / peak
-                if drawdown > max_drawdown:
-                    max_drawdown = drawdown
+            max_drawdown = calculate_mdd(trades['balance'].to_numpy(), INITIAL_CAPITAL)
             print(f"\nMDD: {max_drawdown * 100:.2f}%")
 
         print(f"Total PnL: {total_pnl:.2f} USDT")
@@ -468,37 +634,157 @@ class StochRsiVwapBacktester:
             print(f"Actual Return: {((self.capital + self.total_withdrawn) / INITIAL_CAPITAL - 1) * 100:.2f}%")
 
     def save_trades(self, filename: str):
-        if not self.trades:
+        if self.trades.empty:
             print("No trades to save")
             return
-        df = pd.DataFrame(self.trades)
-        df.to_csv(filename, index=False)
+        self.trades.to_csv(filename, index=False)
         print(f"Trades saved to {filename}")
 
 
 # ============================================
-# 메인 실행
+# 데이터 로드 / 파라미터 스윕
 # ============================================
 
-if __name__ == "__main__":
-    print("Loading data...")
-    df = pd.read_csv('historical_data/BTCUSDT_5m_futures.csv')
-    df.columns = df.columns.str.lower()
+def load_data(path: str, start_date: str = START_DATE, end_date: str = END_DATE,
+              verbose: bool = True) -> pd.DataFrame:
+    if verbose:
+        print("Loading data...")
+    # 컬럼명 소문자화 / timestamp 변환까지 끝낸 데이터를 feather 캐시 (임시 파일에 쓴 뒤 os.replace)
+    cache_path = os.path.splitext(path)[0] + '.feather'
+    if (DATA_CACHE_ENABLED and os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        df = feather.read_table(cache_path, memory_map=True).to_pandas()
+    else:
+        df = pd.read_csv(path, engine='pyarrow')
+        df.columns = df.columns.str.lower()
+        if 'timestamp' not in df.columns and 'open_time' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
+        elif 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if DATA_CACHE_ENABLED:
+            tmp_path = cache_path + '.tmp'
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, cache_path)
+
+    if verbose:
+        print(f"Full data: {len(df)} candles")
+        print(f"Full date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
+
+    # timestamp 는 오름차순 → 비교 마스크 대신 이진 탐색으로 구간 경계를 찾아 슬라이스
+    ts = df['timestamp'].to_numpy()
+    lo = np.searchsorted(ts, np.datetime64(start_date), side='left')
+    hi = np.searchsorted(ts, np.datetime64(end_date), side='right')
+    df = df.iloc[lo:hi].reset_index(drop=True)
+
+    if verbose:
+        print(f"\nFiltered data: {len(df)} candles")
+        print(f"Backtest period: {start_date} to {end_date}")
+    return df
+
+
+# 워커 프로세스별 OHLCV (initializer 로 워커당 한 번만 전달받음, 작업마다 pickle 하지 않음)
+_sweep_df = None
+
+
+def _init_sweep_worker(df: pd.DataFrame):
+    global _sweep_df
+    _sweep_df = df
+
+
+def run_one(params: dict) -> dict:
+    """파라미터 조합 하나를 실행하고 요약 지표 반환 (스윕 워커)"""
+    # 파라미터는 모듈 상수로 참조하므로 워커 프로세스의 전역값을 덮어씀
+    globals().update(params)
+
+    backtester = StochRsiVwapBacktester(_sweep_df)
+    trades = backtester.run(verbose=False)
+
+    total_trades = len(trades)
+    wins = int(np.count_nonzero(trades['pnl'].to_numpy() > 0))
+    return {
+        **params,
+        'trades': total_trades,
+        'win_rate': wins / total_trades * 100 if total_trades > 0 else 0.0,
+        'total_pnl': trades['pnl'].sum(),
+        'final_capital': backtester.capital,
+        'return_pct': (backtester.capital / INITIAL_CAPITAL - 1) * 100,
+        'mdd_pct': calculate_mdd(trades['balance'].to_numpy(), INITIAL_CAPITAL) * 100,
+    }
+
+
+def run_sweep(grid: dict, df: pd.DataFrame, max_workers: int = None) -> pd.DataFrame:
+    """grid 의 모든 조합을 ProcessPoolExecutor 로 병렬 실행 (조합끼리는 서로 독립)"""
+    # run_one 이 grid 키로 모듈 전역을 덮어쓰므로 기존 설정 상수가 아닌 키(오타 등)는 미리 거부
+    unknown = [k for k in grid if not isinstance(globals().get(k), (bool, int, float, str))]
+    if unknown:
+        raise ValueError(f"스윕은 모듈 설정 상수만 지원: {sorted(unknown)}")
+
+    keys = list(grid.keys())
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    print(f"Sweep: {len(combos)} combinations")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                             initargs=(df,)) as executor:
+        results = list(executor.map(run_one, combos))
+
+    return pd.DataFrame(results).sort_values('return_pct', ascending=False).reset_index(drop=True)
+
+
+# 'kernel' 스윕에서 바꿀 수 있는 파라미터 (지표/신호 계산에 영향 없는 것만)
+KERNEL_SWEEP_PARAMS = ('RISK_PER_TRADE', 'MAX_SL_DISTANCE', 'TP_ATR_MULT')
+
+
+def run_kernel_sweep(grid: dict, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    지표/진입 신호는 한 번만 계산하고 커널만 조합 수만큼 prange 로 병렬 실행
+    프로세스 생성/pickle 비용이 없어 TP/리스크처럼 커널 파라미터만 바꾸는 스윕에 유리
+    """
+    unknown = set(grid) - set(KERNEL_SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"kernel 스윕은 {KERNEL_SWEEP_PARAMS} 만 지원: {sorted(unknown)}")
+
+    keys = list(grid.keys())
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    print(f"Kernel sweep: {len(combos)} combinations")
+
+    def column(name, default):
+        return np.array([c.get(name, default) for c in combos], dtype=np.float64)
 
-    if 'timestamp' not in df.columns and 'open_time' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
-    elif 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    backtester = StochRsiVwapBacktester(df)
+    arrays, entry_dir, start_idx = backtester._kernel_inputs()
+    final_capital, total_pnl, n_trades, n_wins, mdd = _sweep_loop(
+        *arrays, entry_dir, start_idx,
+        column('RISK_PER_TRADE', RISK_PER_TRADE), column('MAX_SL_DISTANCE', MAX_SL_DISTANCE),
+        column('TP_ATR_MULT', TP_ATR_MULT),
+        INITIAL_CAPITAL, float(MAX_LEVERAGE), *_fee_rates(), MAKER_FEE, TAKER_FEE,
+        bool(WITHDRAWAL_ENABLED), float(WITHDRAWAL_MULTIPLIER), WITHDRAWAL_RATIO)
+
+    results = pd.DataFrame(combos)
+    results['trades'] = n_trades
+    results['win_rate'] = np.where(n_trades > 0, n_wins / np.maximum(n_trades, 1) * 100, 0.0)
+    results['total_pnl'] = total_pnl
+    results['final_capital'] = final_capital
+    results['return_pct'] = (final_capital / INITIAL_CAPITAL - 1) * 100
+    results['mdd_pct'] = mdd * 100
+    return results.sort_values('return_pct', ascending=False).reset_index(drop=True)
 
-    print(f"Full data: {len(df)} candles")
-    print(f"Full date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
 
-    df = df[(df['timestamp'] >= START_DATE) & (df['timestamp'] <= END_DATE)]
-    df = df.reset_index(drop=True)
+# ============================================
+# 메인 실행
+# ============================================
 
-    print(f"\nFiltered data: {len(df)} candles")
-    print(f"Backtest period: {START_DATE} to {END_DATE}")
+if __name__ == "__main__":
+    df = load_data('historical_data/BTCUSDT_5m_futures.csv')
 
-    backtester = StochRsiVwapBacktester(df)
-    trades = backtester.run()
-    backtester.save_trades('trades_stoch_rsi_vwap.csv')
+    if SWEEP_ENABLED:
+        if SWEEP_MODE == 'kernel':
+            results = run_kernel_sweep(SWEEP_GRID, df)
+        else:
+            results = run_sweep(SWEEP_GRID, df, max_workers=SWEEP_WORKERS)
+        print(results.to_string())
+        results.to_csv('sweep_stoch_rsi_vwap.csv', index=False)
+        print("Sweep results saved to sweep_stoch_rsi_vwap.csv")
+    else:
+        backtester = StochRsiVwapBacktester(df)
+        trades = backtester.run()
+        backtester.save_trades('trades_stoch_rsi_vwap.csv')
@@ -10,15 +10,20 @@ CSV columns:
 
 Partial TP (v7) 는 TP1 과 final close (TP2/SL/LIQ) 를 각각 별도 row 로 기록.
 
+파라미터 탐색은 run_sweep(symbol, tf, version, grid) 로 한 프로세스에서 병렬 실행
+(데이터/FVG/HTF 배열을 공유, 조합별 거래 수 / 승률 / MDD / 최종 자본 반환).
+
 [v2] 진입봉 1m 판별 추가:
   - 진입봉에서 SL/TP 조건이 함께 성립하면 1m 캔들로 실제 순서 판별
   - 진입가 미도달 → 거래 skip (OB 유지)
   - 진입 후 SL/TP → 즉시 해당 결과로 처리
 """
+import itertools
 import os
 import numpy as np
 import pandas as pd
-from numba import njit
+import pyarrow.feather as feather
+from numba import njit, prange
 
 INITIAL_CAPITAL = 1000.0
 TAKER_FEE = 0.0005
@@ -29,6 +34,21 @@ MAX_FVG_QUEUE = 16
 START = '2020-01-06'
 END = '2026-03-02'
 
+REASON_NONE, REASON_LIQ, REASON_SL, REASON_TP, REASON_TP1, REASON_TP2, REASON_END = -1, 0, 1, 2, 3, 4, 5
+REASON_NAMES = np.array(['LIQ', 'SL', 'TP', 'TP1', 'TP2', 'END'])
+RESOLVE_OK, RESOLVE_NO_ENTRY, RESOLVE_SL, RESOLVE_TP = 0, 1, 2, 3
+NS_PER_MINUTE = 60_000_000_000
+# 파싱한 CSV 를 Arrow IPC(feather) 로 캐시, CSV 가 더 새로우면 다시 만듦
+DATA_CACHE_ENABLED = True
+
+# run_backtest 반환 거래 레코드 (필드 순서 = CSV 컬럼 순서)
+TRADE_DTYPE = np.dtype([
+    ('entry_time', 'datetime64[ns]'), ('exit_time', 'datetime64[ns]'),
+    ('direction', 'U5'), ('entry_price', 'f8'), ('exit_price', 'f8'),
+    ('take_profit', 'f8'), ('stop_loss', 'f8'), ('leverage', 'f8'), ('size', 'f8'),
+    ('reason', 'U3'), ('pnl', 'f8'), ('balance', 'f8'),
+])
+
 
 @njit(cache=True)
 def calc_ema(c, span):
@@ -41,13 +61,37 @@ def calc_ema(c, span):
     return e
 
 
+def _read_ohlcv_csv(path: str):
+    """OHLCV CSV 로드. StochRSI / Williams %R 의 load_data 와 같은 .feather 캐시 파일을 공유하므로 정규화도 동일하게."""
+    # 컬럼명 소문자화 / timestamp 변환까지 끝낸 데이터를 feather 캐시 (임시 파일에 쓴 뒤 os.replace)
+    cache_path = os.path.splitext(path)[0] + '.feather'
+    if (DATA_CACHE_ENABLED and os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        df = feather.read_table(cache_path, memory_map=True).to_pandas()
+    else:
+        df = pd.read_csv(path, engine='pyarrow')
+        df.columns = df.columns.str.lower()
+        if 'timestamp' not in df.columns and 'open_time' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
+        elif 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if DATA_CACHE_ENABLED:
+            tmp_path = cache_path + '.tmp'
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, cache_path)
+    return df
+
+
 def load_data(symbol: str, tf: str):
     path = f'../historical_data/{symbol}_{tf}_futures.csv'
     if not os.path.exists(path):
         path = f'historical_data/{symbol}_{tf}_futures.csv'
-    df = pd.read_csv(path, parse_dates=['timestamp'])
-    df = df[(df['timestamp'] >= START) & (df['timestamp'] <= END)].reset_index(drop=True)
-    return df
+    df = _read_ohlcv_csv(path)
+    # timestamp 는 오름차순 → 비교 마스크 대신 이진 탐색으로 구간 경계를 찾아 슬라이스
+    tsv = df['timestamp'].to_numpy()
+    lo = np.searchsorted(tsv, np.datetime64(START), side='left')
+    hi = np.searchsorted(tsv, np.datetime64(END), side='right')
+    return df.iloc[lo:hi].reset_index(drop=True)
 
 
 def load_1m_data(symbol: str):
@@ -55,31 +99,34 @@ def load_1m_data(symbol: str):
     for path in [f'../historical_data/{symbol}_1m_futures.csv',
                  f'historical_data/{symbol}_1m_futures.csv']:
         if os.path.exists(path):
-            df = pd.read_csv(path, parse_dates=['timestamp'])
+            df = _read_ohlcv_csv(path)
             return df.set_index('timestamp')[['high', 'low']]
     return None
 
 
-def resolve_entry_bar_1m(bar1m, entry_ts, ep, sl_p, tp_p, direction, tf_minutes):
+@njit(cache=True)
+def resolve_entry_bar_1m(m1_ts, m1_h, m1_l, entry_ts, ep, sl_p, tp_p, direction, tf_minutes):
     """
     1m 캔들로 진입봉 내 순서 판별.
+    m1_ts 는 오름차순 int64(ns) timestamp, entry_ts 도 int64(ns).
 
     Returns:
-        'OK'       - 진입 확인, entry bar 내 SL/TP 없음 → 다음 bar 처리
-        'NO_ENTRY' - 1m상 진입가 미도달 → 거래 skip
-        'SL'       - 진입 후 SL 먼저 hit (또는 진입봉에서 즉시 SL)
-        'TP'       - 진입 후 TP 먼저 hit
+        RESOLVE_OK       - 진입 확인, entry bar 내 SL/TP 없음 → 다음 bar 처리
+        RESOLVE_NO_ENTRY - 1m상 진입가 미도달 → 거래 skip
+        RESOLVE_SL       - 진입 후 SL 먼저 hit (또는 진입봉에서 즉시 SL)
+        RESOLVE_TP       - 진입 후 TP 먼저 hit
     """
-    if bar1m is None:
-        return 'OK'
-
     entered = False
-    for offset in range(tf_minutes):
-        t1 = entry_ts + pd.Timedelta(minutes=offset)
-        if t1 not in bar1m.index:
+    end_ts = entry_ts + tf_minutes * NS_PER_MINUTE
+    # 진입봉 구간 [entry_ts, end_ts) 의 1m 봉만 순서대로 확인 (누락된 분은 건너뜀)
+    j = np.searchsorted(m1_ts, entry_ts)
+    while j < len(m1_ts) and m1_ts[j] < end_ts:
+        if (m1_ts[j] - entry_ts) % NS_PER_MINUTE != 0:
+            j += 1
             continue
-        h1 = bar1m.loc[t1, 'high']
-        l1 = bar1m.loc[t1, 'low']
+        h1 = m1_h[j]
+        l1 = m1_l[j]
+        j += 1
 
         if not entered:
             entry_hit = (l1 <= ep) if direction == 1 else (h1 >= ep)
@@ -96,16 +143,16 @@ def resolve_entry_bar_1m(bar1m, entry_ts, ep, sl_p, tp_p, direction, tf_minutes)
             tp_hit = l1 <= tp_p
 
         if sl_hit and tp_hit:
-            return 'SL'   # 같은 봉 → 보수적
+            return RESOLVE_SL   # 같은 봉 → 보수적
         elif sl_hit:
-            return 'SL'
+            return RESOLVE_SL
         elif tp_hit:
-            return 'TP'
+            return RESOLVE_TP
 
     if not entered:
-        return 'NO_ENTRY'
+        return RESOLVE_NO_ENTRY
 
-    return 'OK'
+    return RESOLVE_OK
 
 
 def build_htf_arrays(df):
@@ -118,67 +165,94 @@ def build_htf_arrays(df):
     hourly_close = hourly.values.astype(np.float64)
     hourly_ema = calc_ema(hourly_close, HTF_EMA_LEN)
     hourly_ema[:HTF_EMA_LEN] = np.nan
-    hour_to_idx = {h: idx for idx, h in enumerate(hourly.index)}
+    # 각 bar 의 1h 버킷 위치를 한 번에 조회 → 직전(닫힌) 1h 인덱스
+    li = hourly.index.get_indexer(hour_starts) - 1
+    has_prev = li >= 0
     htf_close_arr = np.full(len(ts), np.nan)
     htf_ema_arr = np.full(len(ts), np.nan)
-    for i in range(len(ts)):
-        idx = hour_to_idx.get(hour_starts.iloc[i], -1)
-        li = idx - 1
-        if li >= 0:
-            htf_close_arr[i] = hourly_close[li]
-            htf_ema_arr[i] = hourly_ema[li]
+    htf_close_arr[has_prev] = hourly_close[li[has_prev]]
+    htf_ema_arr[has_prev] = hourly_ema[li[has_prev]]
     return htf_close_arr, htf_ema_arr
 
 
-def run_backtest(symbol, tf, version,
-                 sl_buffer_pct,
-                 rr=None, rr1=None, rr2=None, be_after_tp1=0,
-                 max_wait=20,
-                 risk_per_trade=0.02,
-                 min_fvg_pct=0.0,
-                 use_htf=None):
+def find_fvgs(h, l, c, min_fvg_pct):
     """
-    version: 'v2'/'v3'/'v4'/'v5' (no HTF, single TP)
-             'v6_htf'/'v6_1'/'v6_2' (HTF, single TP)
-             'v7_partial' (HTF, partial TP)
+    봉 i 에서 새로 생긴 FVG 여부 (포지션 경로와 무관하므로 전 구간을 한 번에 계산).
+      long  : l[i] > h[i-2], 갭 = [h[i-2], l[i]]
+      short : h[i] < l[i-2], 갭 = [h[i], l[i-2]]
+    갭 크기 / close 가 min_fvg_pct 미만이면 제외.
     """
-    if use_htf is None:
-        use_htf = version in ('v6_htf', 'v6_1', 'v6_2', 'v7_partial')
-    is_partial = (version == 'v7_partial')
+    long_gap = np.zeros(len(c), dtype=np.bool_)
+    short_gap = np.zeros(len(c), dtype=np.bool_)
+    long_gap[2:] = (l[2:] > h[:-2]) & ((l[2:] - h[:-2]) / c[2:] >= min_fvg_pct)
+    short_gap[2:] = (h[2:] < l[:-2]) & ((l[:-2] - h[2:]) / c[2:] >= min_fvg_pct)
+    return long_gap, short_gap
 
-    tf_minutes = int(tf.replace('m', ''))
 
-    df = load_data(symbol, tf)
-    h = df['high'].values.astype(np.float64)
-    l = df['low'].values.astype(np.float64)
-    c = df['close'].values.astype(np.float64)
-    ts = df['timestamp']
-    n = len(c)
-
-    if use_htf:
-        htf_close, htf_ema = build_htf_arrays(df)
-    else:
-        htf_close = np.full(n, np.nan)
-        htf_ema = np.full(n, np.nan)
+@njit(cache=True)
+def calc_max_dd(balance, reason, initial_capital):
+    """거래별 잔고 기준 최대 낙폭 (peak 는 초기 자본 포함 누적 최고치). run_backtest 와 _sweep_loop 공용."""
+    peak = initial_capital
+    dd_max = 0.0
+    for t in range(len(balance)):
+        if balance[t] > peak:
+            peak = balance[t]
+        # TP1 부분 청산 시점은 drawdown 측정에서 제외 (peak 갱신에만 반영)
+        if reason[t] != REASON_TP1:
+            dd = (peak - balance[t]) / peak
+            if dd > dd_max:
+                dd_max = dd
+    return dd_max
 
-    # 1m 데이터 로드 (없으면 None → 기존 방식 fallback)
-    bar1m = load_1m_data(symbol)
 
-    cap = INITIAL_CAPITAL
-    peak = cap
-    max_dd = 0.0
+@njit(cache=True)
+def _run_loop(h, l, c, long_gap, short_gap, htf_close, htf_ema,
+              ts, m1_ts, m1_h, m1_l, has_1m, tf_minutes, use_htf,
+              is_partial, sl_buffer_pct, rr, rr1, rr2, be_after_tp1,
+              max_wait, risk_per_trade,
+              initial_capital, maker_fee, taker_fee, max_lev, max_fvg_queue):
+    """
+    봉 단위 상태머신 (FVG 감지 → 리테스트 진입 → LIQ/SL/TP(1/2) 청산).
+    포지션 상태는 로컬 스칼라, 대기 FVG 는 고정 크기 배열 큐로 유지.
+    long_gap/short_gap: 봉별 신규 FVG 여부 (find_fvgs)
+    ts/m1_ts 는 int64(ns) timestamp, has_1m=False 면 진입봉 1m 판별 생략.
+
+    Returns: (trades, cap)
+      trades: 컬럼별 배열 튜플 (entry_idx, exit_idx, direction, entry_price, exit_price,
+              take_profit, stop_loss, leverage, size, reason, pnl, balance)
+    """
+    n = len(c)
 
-    # pending FVGs
-    long_top = []
-    long_bot = []
-    long_bar = []
-    short_top = []
-    short_bot = []
-    short_bar = []
+    # 봉마다 최대 2건 (TP1 + TP2) + 종료 시 강제 청산 1건
+    max_trades = 2 * n + 1
+    tr_entry_idx = np.empty(max_trades, dtype=np.int64)
+    tr_exit_idx = np.empty(max_trades, dtype=np.int64)
+    tr_direction = np.empty(max_trades, dtype=np.int8)
+    tr_entry_price = np.empty(max_trades)
+    tr_exit_price = np.empty(max_trades)
+    tr_take_profit = np.empty(max_trades)
+    tr_stop_loss = np.empty(max_trades)
+    tr_leverage = np.empty(max_trades)
+    tr_size = np.empty(max_trades)
+    tr_reason = np.empty(max_trades, dtype=np.int8)
+    tr_pnl = np.empty(max_trades)
+    tr_balance = np.empty(max_trades)
+    n_trades = 0
+
+    cap = initial_capital
+
+    # pending FVGs (앞에서부터 n_long / n_short 개가 유효, 추가 순서 유지)
+    long_top = np.empty(max_fvg_queue)
+    long_bot = np.empty(max_fvg_queue)
+    long_bar = np.empty(max_fvg_queue, dtype=np.int64)
+    short_top = np.empty(max_fvg_queue)
+    short_bot = np.empty(max_fvg_queue)
+    short_bar = np.empty(max_fvg_queue, dtype=np.int64)
+    n_long = 0
+    n_short = 0
 
     # position state
     position = 0
-    entry_time = None
     entry_price = 0.0
     entry_idx = -1
     sz_total = 0.0
@@ -191,447 +265,472 @@ def run_backtest(symbol, tf, version,
     lev = 1.0
     tp1_hit = False
 
-    trades = []
-
-    def append_trade(exit_time, exit_price, reason, size, pnl_val, balance):
-        trades.append({
-            'entry_time': entry_time,
-            'exit_time': exit_time,
-            'direction': 'LONG' if position == 1 else 'SHORT',
-            'entry_price': entry_price,
-            'exit_price': exit_price,
-            'take_profit': tp2_p if is_partial else tp_p,
-            'stop_loss': sl_p,
-            'leverage': round(lev, 2),
-            'size': round(size, 8),
-            'reason': reason,
-            'pnl': round(pnl_val, 4),
-            'balance': round(balance, 4),
-        })
-
-    def reset_position():
-        nonlocal position, tp1_hit, sz_total, sz_remain
-        position = 0
-        tp1_hit = False
-        sz_total = 0.0
-        sz_remain = 0.0
-
-    def process_sl_exit(bar_i, exit_price):
-        """SL 체결 처리 (진입봉 포함). cap/peak/max_dd 갱신."""
-        nonlocal cap, peak, max_dd
-        if position == 1:
-            pnl_raw = (exit_price - entry_price) * sz_remain
-        else:
-            pnl_raw = (entry_price - exit_price) * sz_remain
-        entry_fee = entry_price * sz_remain * MAKER_FEE
-        exit_fee  = exit_price * sz_remain * TAKER_FEE
-        net = pnl_raw - entry_fee - exit_fee
-        cap += net
-        if cap < 0:
-            cap = 0.0
-        append_trade(ts.iloc[bar_i], exit_price, 'SL', sz_remain, net, cap)
-        if cap > peak:
-            peak = cap
-        dd = (peak - cap) / peak if peak > 0 else 0.0
-        if dd > max_dd:
-            max_dd = dd
-        reset_position()
-
-    def process_tp_exit(bar_i, exit_price):
-        """TP 체결 처리 (진입봉 포함)."""
-        nonlocal cap, peak, max_dd
-        if position == 1:
-            pnl_raw = (exit_price - entry_price) * sz_remain
-        else:
-            pnl_raw = (entry_price - exit_price) * sz_remain
-        entry_fee = entry_price * sz_remain * MAKER_FEE
-        exit_fee  = exit_price * sz_remain * MAKER_FEE
-        net = pnl_raw - entry_fee - exit_fee
-        cap += net
-        if cap < 0:
-            cap = 0.0
-        append_trade(ts.iloc[bar_i], exit_price, 'TP', sz_remain, net, cap)
-        if cap > peak:
-            peak = cap
-        dd = (peak - cap) / peak if peak > 0 else 0.0
-        if dd > max_dd:
-            max_dd = dd
-        reset_position()
-
-    for i in range(2, n):
-        # EXIT (진입봉 다음 bar 부터)
-        if position != 0 and i > entry_idx:
-            # LIQ
-            liq_hit = False
-            if position == 1 and l[i] <= liq_p:
-                liq_hit = True
-            elif position == -1 and h[i] >= liq_p:
-                liq_hit = True
-            if liq_hit:
-                if position == 1:
-                    pnl_raw = (liq_p - entry_price) * sz_remain
-                else:
-                    pnl_raw = (entry_price - liq_p) * sz_remain
-                entry_fee = entry_price * sz_remain * MAKER_FEE
-                exit_fee = liq_p * sz_remain * TAKER_FEE
-                net = pnl_raw - entry_fee - exit_fee
-                cap += net
-                if cap < 0:
-                    cap = 0.0
-                append_trade(ts.iloc[i], liq_p, 'LIQ', sz_remain, net, cap)
-                if cap > peak:
-                    peak = cap
-                dd = (peak - cap) / peak if peak > 0 else 0.0
-                if dd > max_dd:
-                    max_dd = dd
-                reset_position()
-                if cap <= 0:
-                    break
-                continue
-
-            # SL
-            sl_hit = False
-            if position == 1 and l[i] <= sl_p:
-                sl_hit = True
-            elif position == -1 and h[i] >= sl_p:
-                sl_hit = True
-            if sl_hit:
-                if position == 1:
-                    pnl_raw = (sl_p - entry_price) * sz_remain
-                else:
-                    pnl_raw = (entry_price - sl_p) * sz_remain
-                entry_fee = entry_price * sz_remain * MAKER_FEE
-                exit_fee = sl_p * sz_remain * TAKER_FEE
-                net = pnl_raw - entry_fee - exit_fee
-                cap += net
-                if cap < 0:
-                    cap = 0.0
-                append_trade(ts.iloc[i], sl_p, 'SL', sz_remain, net, cap)
-                if cap > peak:
-                    peak = cap
-                dd = (peak - cap) / peak if peak > 0 else 0.0
-                if dd > max_dd:
-                    max_dd = dd
-                reset_position()
-                if cap <= 0:
-                    break
-                continue
-
-            if is_partial:
-                # TP1
-                if not tp1_hit:
-                    tp1_touch = False
-                    if position == 1 and h[i] >= tp1_p:
-                        tp1_touch = True
-                    elif position == -1 and l[i] <= tp1_p:
-                        tp1_touch = True
-                    if tp1_touch:
-                        sz_half = sz_total * 0.5
-                        if position == 1:
-                            pnl_raw = (tp1_p - entry_price) * sz_half
-                        else:
-                            pnl_raw = (entry_price - tp1_p) * sz_half
-                        entry_fee = entry_price * sz_half * MAKER_FEE
-                        exit_fee = tp1_p * sz_half * MAKER_FEE
-                        net = pnl_raw - entry_fee - exit_fee
-                        cap += net
-                        append_trade(ts.iloc[i], tp1_p, 'TP1', sz_half, net, cap)
-                        tp1_hit = True
-                        sz_remain = sz_total - sz_half
-                        if be_after_tp1 == 1:
-                            sl_p = entry_price
-                        if cap > peak:
-                            peak = cap
-
-                # TP2
-                if tp1_hit:
-                    tp2_touch = False
-                    if position == 1 and h[i] >= tp2_p:
-                        tp2_touch = True
-                    elif position == -1 and l[i] <= tp2_p:
-                        tp2_touch = True
-                    if tp2_touch:
-                        if position == 1:
-                            pnl_raw = (tp2_p - entry_price) * sz_remain
-                        else:
-                            pnl_raw = (entry_price - tp2_p) * sz_remain
-                        entry_fee = entry_price * sz_remain * MAKER_FEE
-                        exit_fee = tp2_p * sz_remain * MAKER_FEE
-                        net = pnl_raw - entry_fee - exit_fee
-                        cap += net
-                        if cap < 0:
-                            cap = 0.0
-                        append_trade(ts.iloc[i], tp2_p, 'TP2', sz_remain, net, cap)
-                        if cap > peak:
-                            peak = cap
-                        dd = (peak - cap) / peak if peak > 0 else 0.0
-                        if dd > max_dd:
-                            max_dd = dd
-                        reset_position()
-                        if cap <= 0:
-                            break
-                        continue
+    # 진입마다 쓰는 상수 배수는 루프 밖에서 한 번만 계산
+    long_sl_mult = 1.0 - sl_buffer_pct    # 갭 하단 아래 SL
+    short_sl_mult = 1.0 + sl_buffer_pct   # 갭 상단 위 SL
+    round_trip_fee = taker_fee * 2.0
+
+    for i in range(2, n + 1):
+        exit_p = 0.0
+        exit_fee_rate = 0.0
+        reason = REASON_NONE
+
+        if i == n:
+            # 데이터 끝: 열린 포지션은 마지막 close 로 청산
+            if position == 0:
+                break
+            exit_p = c[n - 1]
+            exit_fee_rate = taker_fee
+            reason = REASON_END
+        elif position != 0 and i > entry_idx:
+            # EXIT (진입봉 다음 bar 부터)
+            # position(+1/-1) 를 부호로 써서 LONG/SHORT 를 한 경로로 판정
+            # adverse: 손실 방향 극값 (LONG=저가, SHORT=고가), favorable: 이익 방향 극값
+            if position == 1:
+                adverse = l[i]
+                favorable = h[i]
             else:
-                # single TP
-                tp_touch = False
-                if position == 1 and h[i] >= tp_p:
-                    tp_touch = True
-                elif position == -1 and l[i] <= tp_p:
-                    tp_touch = True
-                if tp_touch:
-                    if position == 1:
-                        pnl_raw = (tp_p - entry_price) * sz_remain
-                    else:
-                        pnl_raw = (entry_price - tp_p) * sz_remain
-                    entry_fee = entry_price * sz_remain * MAKER_FEE
-                    exit_fee = tp_p * sz_remain * MAKER_FEE
+                adverse = h[i]
+                favorable = l[i]
+
+            if position * adverse <= position * liq_p:
+                exit_p = liq_p
+                exit_fee_rate = taker_fee
+                reason = REASON_LIQ
+            elif position * adverse <= position * sl_p:
+                exit_p = sl_p
+                exit_fee_rate = taker_fee
+                reason = REASON_SL
+            elif is_partial:
+                # TP1: 절반만 청산하고 포지션 유지
+                if not tp1_hit and position * favorable >= position * tp1_p:
+                    sz_half = sz_total * 0.5
+                    pnl_raw = position * (tp1_p - entry_price) * sz_half
+                    entry_fee = entry_price * sz_half * maker_fee
+                    exit_fee = tp1_p * sz_half * maker_fee
                     net = pnl_raw - entry_fee - exit_fee
                     cap += net
-                    if cap < 0:
-                        cap = 0.0
-                    append_trade(ts.iloc[i], tp_p, 'TP', sz_remain, net, cap)
-                    if cap > peak:
-                        peak = cap
-                    dd = (peak - cap) / peak if peak > 0 else 0.0
-                    if dd > max_dd:
-                        max_dd = dd
-                    reset_position()
-                    if cap <= 0:
-                        break
-                    continue
+                    tr_entry_idx[n_trades] = entry_idx
+                    tr_exit_idx[n_trades] = i
+                    tr_direction[n_trades] = position
+                    tr_entry_price[n_trades] = entry_price
+                    tr_exit_price[n_trades] = tp1_p
+                    tr_take_profit[n_trades] = tp2_p
+                    tr_stop_loss[n_trades] = sl_p
+                    tr_leverage[n_trades] = lev
+                    tr_size[n_trades] = sz_half
+                    tr_reason[n_trades] = REASON_TP1
+                    tr_pnl[n_trades] = net
+                    tr_balance[n_trades] = cap
+                    n_trades += 1
+                    tp1_hit = True
+                    sz_remain = sz_total - sz_half
+                    if be_after_tp1 == 1:
+                        sl_p = entry_price
 
-        if cap <= 0:
-            break
+                # TP2
+                if tp1_hit and position * favorable >= position * tp2_p:
+                    exit_p = tp2_p
+                    exit_fee_rate = maker_fee
+                    reason = REASON_TP2
+            elif position * favorable >= position * tp_p:
+                # single TP
+                exit_p = tp_p
+                exit_fee_rate = maker_fee
+                reason = REASON_TP
+
+        if reason == REASON_NONE:
+            if cap <= 0:
+                break
+
+            # FVG detection (갭 판정은 find_fvgs 에서 미리 계산)
+            if long_gap[i] and n_long < max_fvg_queue:
+                long_top[n_long] = l[i]
+                long_bot[n_long] = h[i-2]
+                long_bar[n_long] = i
+                n_long += 1
+            if short_gap[i] and n_short < max_fvg_queue:
+                short_top[n_short] = l[i-2]
+                short_bot[n_short] = h[i]
+                short_bar[n_short] = i
+                n_short += 1
+
+            # Invalidation / max wait (남는 항목을 앞으로 당겨 순서 유지)
+            kept = 0
+            for k in range(n_long):
+                if not (c[i] < long_bot[k] or (i - long_bar[k]) > max_wait):
+                    long_top[kept] = long_top[k]
+                    long_bot[kept] = long_bot[k]
+                    long_bar[kept] = long_bar[k]
+                    kept += 1
+            n_long = kept
+            kept = 0
+            for k in range(n_short):
+                if not (c[i] > short_top[k] or (i - short_bar[k]) > max_wait):
+                    short_top[kept] = short_top[k]
+                    short_bot[kept] = short_bot[k]
+                    short_bar[kept] = short_bar[k]
+                    kept += 1
+            n_short = kept
+
+            # ENTRY (only if no position)
+            if position == 0:
+                result = RESOLVE_OK
+                htf_bull = True
+                htf_bear = True
+                if use_htf:
+                    if np.isnan(htf_ema[i]):
+                        htf_bull = False
+                        htf_bear = False
+                    else:
+                        htf_bull = htf_close[i] > htf_ema[i]
+                        htf_bear = htf_close[i] < htf_ema[i]
+
+                # LONG
+                if htf_bull and n_long > 0:
+                    best_k = -1
+                    best_bar = -1
+                    for k in range(n_long):
+                        if long_bar[k] < i and l[i] <= long_top[k]:
+                            if long_bar[k] > best_bar:
+                                best_bar = long_bar[k]; best_k = k
+                    if best_k >= 0:
+                        ep_i = long_top[best_k]
+                        if ep_i > h[i]: ep_i = h[i]
+                        if ep_i < l[i]: ep_i = l[i]
+                        sl_edge = long_bot[best_k] * long_sl_mult
+                        sl_dist = ep_i - sl_edge
+                        if sl_dist > 0:
+                            sl_pct = sl_dist / ep_i
+                            eff_sl = sl_pct + round_trip_fee
+                            lev_ = risk_per_trade / eff_sl
+                            if lev_ > max_lev: lev_ = max_lev
+                            if lev_ < 1.0: lev_ = 1.0
+                            notional = cap * lev_
+                            size = notional / ep_i
+                            liq_edge = ep_i * (1.0 - 1.0 / lev_)
+                            tp_edge = ep_i + rr * sl_dist if not is_partial else 0.0
+                            tp1_edge = ep_i + rr1 * sl_dist if is_partial else 0.0
+                            tp2_edge = ep_i + rr2 * sl_dist if is_partial else 0.0
+
+                            # 진입봉 SL/TP 동시 조건 체크 (1m 판별은 single TP 만)
+                            if (not is_partial and has_1m
+                                    and (l[i] <= sl_edge or h[i] >= tp_edge)):
+                                result = resolve_entry_bar_1m(
+                                    m1_ts, m1_h, m1_l, ts[i], ep_i, sl_edge, tp_edge, 1, tf_minutes)
+
+                            if result == RESOLVE_NO_ENTRY:
+                                continue  # OB 유지, 거래 skip
+
+                            # 포지션 셋업
+                            entry_price = ep_i
+                            entry_idx = i
+                            sz_total = size
+                            sz_remain = size
+                            sl_p = sl_edge
+                            liq_p = liq_edge
+                            lev = lev_
+                            tp_p = tp_edge
+                            tp1_p = tp1_edge
+                            tp2_p = tp2_edge
+                            tp1_hit = False
+                            position = 1
 
-        # FVG detection
-        if l[i] > h[i-2]:
-            gap_top = l[i]
-            gap_bot = h[i-2]
-            if (gap_top - gap_bot) / c[i] >= min_fvg_pct:
-                if len(long_top) < MAX_FVG_QUEUE:
-                    long_top.append(gap_top)
-                    long_bot.append(gap_bot)
-                    long_bar.append(i)
-        if h[i] < l[i-2]:
-            gap_top = l[i-2]
-            gap_bot = h[i]
-            if (gap_top - gap_bot) / c[i] >= min_fvg_pct:
-                if len(short_top) < MAX_FVG_QUEUE:
-                    short_top.append(gap_top)
-                    short_bot.append(gap_bot)
-                    short_bar.append(i)
-
-        # Invalidation / max wait
-        k = 0
-        while k < len(long_top):
-            if c[i] < long_bot[k] or (i - long_bar[k]) > max_wait:
-                long_top.pop(k); long_bot.pop(k); long_bar.pop(k)
-            else:
-                k += 1
-        k = 0
-        while k < len(short_top):
-            if c[i] > short_top[k] or (i - short_bar[k]) > max_wait:
-                short_top.pop(k); short_bot.pop(k); short_bar.pop(k)
-            else:
-                k += 1
-
-        # ENTRY (only if no position)
-        if position == 0:
-            htf_bull = True
-            htf_bear = True
-            if use_htf:
-                if np.isnan(htf_ema[i]):
-                    htf_bull = False
-                    htf_bear = False
-                else:
-                    htf_bull = htf_close[i] > htf_ema[i]
-                    htf_bear = htf_close[i] < htf_ema[i]
-
-            # LONG
-            if htf_bull and len(long_top) > 0:
-                best_k = -1
-                best_bar = -1
-                for k in range(len(long_top)):
-                    if long_bar[k] < i and l[i] <= long_top[k]:
-                        if long_bar[k] > best_bar:
-                            best_bar = long_bar[k]; best_k = k
-                if best_k >= 0:
-                    ep_i = long_top[best_k]
-                    if ep_i > h[i]: ep_i = h[i]
-                    if ep_i < l[i]: ep_i = l[i]
-                    sl_edge = long_bot[best_k] * (1.0 - sl_buffer_pct)
-                    sl_dist = ep_i - sl_edge
-                    if sl_dist > 0:
-                        sl_pct = sl_dist / ep_i
-                        eff_sl = sl_pct + TAKER_FEE * 2.0
-                        lev_ = risk_per_trade / eff_sl
-                        if lev_ > MAX_LEV: lev_ = MAX_LEV
-                        if lev_ < 1.0: lev_ = 1.0
-                        notional = cap * lev_
-                        size = notional / ep_i
-                        liq_edge = ep_i * (1.0 - 1.0 / lev_)
-                        tp_edge = ep_i + rr * sl_dist if not is_partial else 0.0
-                        tp1_edge = ep_i + rr1 * sl_dist if is_partial else 0.0
-                        tp2_edge = ep_i + rr2 * sl_dist if is_partial else 0.0
-
-                        # 진입봉 SL/TP 동시 조건 체크
-                        check_tp = tp2_edge if is_partial else tp_edge
-                        need_resolve = (l[i] <= sl_edge) or (h[i] >= check_tp)
-
-                        if need_resolve and not is_partial:
-                            result = resolve_entry_bar_1m(
-                                bar1m, ts.iloc[i], ep_i, sl_edge, tp_edge, 1, tf_minutes)
-                        else:
-                            result = 'OK'
-
-                        if result == 'NO_ENTRY':
-                            continue  # OB 유지, 거래 skip
-
-                        # 포지션 셋업
-                        entry_price = ep_i
-                        entry_time = ts.iloc[i]
-                        entry_idx = i
-                        sz_total = size
-                        sz_remain = size
-                        sl_p = sl_edge
-                        liq_p = liq_edge
-                        lev = lev_
-                        tp_p = tp_edge
-                        tp1_p = tp1_edge
-                        tp2_p = tp2_edge
-                        tp1_hit = False
-                        position = 1
-
-                        if result == 'SL':
-                            process_sl_exit(i, sl_p)
                             # OB는 진입 후 처리했으므로 clear
-                            long_top.clear(); long_bot.clear(); long_bar.clear()
-                            if cap <= 0: break
-                            continue
-                        elif result == 'TP':
-                            process_tp_exit(i, tp_p)
-                            long_top.clear(); long_bot.clear(); long_bar.clear()
-                            if cap <= 0: break
-                            continue
-                        else:
-                            long_top.clear(); long_bot.clear(); long_bar.clear()
-                            continue
-
-            # SHORT
-            if htf_bear and len(short_top) > 0:
-                best_k = -1
-                best_bar = -1
-                for k in range(len(short_top)):
-                    if short_bar[k] < i and h[i] >= short_bot[k]:
-                        if short_bar[k] > best_bar:
-                            best_bar = short_bar[k]; best_k = k
-                if best_k >= 0:
-                    ep_i = short_bot[best_k]
-                    if ep_i > h[i]: ep_i = h[i]
-                    if ep_i < l[i]: ep_i = l[i]
-                    sl_edge = short_top[best_k] * (1.0 + sl_buffer_pct)
-                    sl_dist = sl_edge - ep_i
-                    if sl_dist > 0:
-                        sl_pct = sl_dist / ep_i
-                        eff_sl = sl_pct + TAKER_FEE * 2.0
-                        lev_ = risk_per_trade / eff_sl
-                        if lev_ > MAX_LEV: lev_ = MAX_LEV
-                        if lev_ < 1.0: lev_ = 1.0
-                        notional = cap * lev_
-                        size = notional / ep_i
-                        liq_edge = ep_i * (1.0 + 1.0 / lev_)
-                        tp_edge = ep_i - rr * sl_dist if not is_partial else 0.0
-                        tp1_edge = ep_i - rr1 * sl_dist if is_partial else 0.0
-                        tp2_edge = ep_i - rr2 * sl_dist if is_partial else 0.0
-
-                        check_tp = tp2_edge if is_partial else tp_edge
-                        need_resolve = (h[i] >= sl_edge) or (l[i] <= check_tp)
-
-                        if need_resolve and not is_partial:
-                            result = resolve_entry_bar_1m(
-                                bar1m, ts.iloc[i], ep_i, sl_edge, tp_edge, -1, tf_minutes)
-                        else:
-                            result = 'OK'
-
-                        if result == 'NO_ENTRY':
-                            continue
-
-                        entry_price = ep_i
-                        entry_time = ts.iloc[i]
-                        entry_idx = i
-                        sz_total = size
-                        sz_remain = size
-                        sl_p = sl_edge
-                        liq_p = liq_edge
-                        lev = lev_
-                        tp_p = tp_edge
-                        tp1_p = tp1_edge
-                        tp2_p = tp2_edge
-                        tp1_hit = False
-                        position = -1
-
-                        if result == 'SL':
-                            process_sl_exit(i, sl_p)
-                            short_top.clear(); short_bot.clear(); short_bar.clear()
-                            if cap <= 0: break
-                            continue
-                        elif result == 'TP':
-                            process_tp_exit(i, tp_p)
-                            short_top.clear(); short_bot.clear(); short_bar.clear()
-                            if cap <= 0: break
-                            continue
-                        else:
-                            short_top.clear(); short_bot.clear(); short_bar.clear()
-                            continue
-
-    # Force close remainder
-    if position != 0:
-        px = c[-1]
-        if position == 1:
-            pnl_raw = (px - entry_price) * sz_remain
-        else:
-            pnl_raw = (entry_price - px) * sz_remain
-        entry_fee = entry_price * sz_remain * MAKER_FEE
-        exit_fee = px * sz_remain * TAKER_FEE
+                            n_long = 0
+                            if result == RESOLVE_OK:
+                                continue
+
+                # SHORT (LONG 이 진입봉에서 바로 청산된 경우는 position != 0 이라 건너뜀)
+                if position == 0 and htf_bear and n_short > 0:
+                    best_k = -1
+                    best_bar = -1
+                    for k in range(n_short):
+                        if short_bar[k] < i and h[i] >= short_bot[k]:
+                            if short_bar[k] > best_bar:
+                                best_bar = short_bar[k]; best_k = k
+                    if best_k >= 0:
+                        ep_i = short_bot[best_k]
+                        if ep_i > h[i]: ep_i = h[i]
+                        if ep_i < l[i]: ep_i = l[i]
+                        sl_edge = short_top[best_k] * short_sl_mult
+                        sl_dist = sl_edge - ep_i
+                        if sl_dist > 0:
+                            sl_pct = sl_dist / ep_i
+                            eff_sl = sl_pct + round_trip_fee
+                            lev_ = risk_per_trade / eff_sl
+                            if lev_ > max_lev: lev_ = max_lev
+                            if lev_ < 1.0: lev_ = 1.0
+                            notional = cap * lev_
+                            size = notional / ep_i
+                            liq_edge = ep_i * (1.0 + 1.0 / lev_)
+                            tp_edge = ep_i - rr * sl_dist if not is_partial else 0.0
+                            tp1_edge = ep_i - rr1 * sl_dist if is_partial else 0.0
+                            tp2_edge = ep_i - rr2 * sl_dist if is_partial else 0.0
+
+                            if (not is_partial and has_1m
+                                    and (h[i] >= sl_edge or l[i] <= tp_edge)):
+                                result = resolve_entry_bar_1m(
+                                    m1_ts, m1_h, m1_l, ts[i], ep_i, sl_edge, tp_edge, -1, tf_minutes)
+
+                            if result == RESOLVE_NO_ENTRY:
+                                continue
+
+                            entry_price = ep_i
+                            entry_idx = i
+                            sz_total = size
+                            sz_remain = size
+                            sl_p = sl_edge
+                            liq_p = liq_edge
+                            lev = lev_
+                            tp_p = tp_edge
+                            tp1_p = tp1_edge
+                            tp2_p = tp2_edge
+                            tp1_hit = False
+                            position = -1
+
+                            n_short = 0
+                            if result == RESOLVE_OK:
+                                continue
+
+                # 진입봉 내 SL/TP 체결 → 아래 공통 청산
+                if result == RESOLVE_SL:
+                    exit_p = sl_p
+                    exit_fee_rate = taker_fee
+                    reason = REASON_SL
+                elif result == RESOLVE_TP:
+                    exit_p = tp_p
+                    exit_fee_rate = maker_fee
+                    reason = REASON_TP
+
+        if reason == REASON_NONE:
+            continue
+
+        # 공통 청산 (LIQ/SL/TP/TP2/END, 진입봉 1m SL/TP): 남은 수량 전부
+        pnl_raw = position * (exit_p - entry_price) * sz_remain
+        entry_fee = entry_price * sz_remain * maker_fee
+        exit_fee = exit_p * sz_remain * exit_fee_rate
         net = pnl_raw - entry_fee - exit_fee
         cap += net
         if cap < 0:
             cap = 0.0
-        append_trade(ts.iloc[-1], px, 'END', sz_remain, net, cap)
-        if cap > peak:
-            peak = cap
-        dd = (peak - cap) / peak if peak > 0 else 0.0
-        if dd > max_dd:
-            max_dd = dd
+        tr_entry_idx[n_trades] = entry_idx
+        tr_exit_idx[n_trades] = min(i, n - 1)
+        tr_direction[n_trades] = position
+        tr_entry_price[n_trades] = entry_price
+        tr_exit_price[n_trades] = exit_p
+        tr_take_profit[n_trades] = tp2_p if is_partial else tp_p
+        tr_stop_loss[n_trades] = sl_p
+        tr_leverage[n_trades] = lev
+        tr_size[n_trades] = sz_remain
+        tr_reason[n_trades] = reason
+        tr_pnl[n_trades] = net
+        tr_balance[n_trades] = cap
+        n_trades += 1
+        position = 0
+        tp1_hit = False
+        sz_total = 0.0
+        sz_remain = 0.0
+        if cap <= 0:
+            break
+
+    trades = (tr_entry_idx[:n_trades], tr_exit_idx[:n_trades], tr_direction[:n_trades],
+              tr_entry_price[:n_trades], tr_exit_price[:n_trades], tr_take_profit[:n_trades],
+              tr_stop_loss[:n_trades], tr_leverage[:n_trades], tr_size[:n_trades],
+              tr_reason[:n_trades], tr_pnl[:n_trades], tr_balance[:n_trades])
+    return trades, cap
+
+
+@njit(parallel=True, cache=True)
+def _sweep_loop(h, l, c, long_gap, short_gap, htf_close, htf_ema,
+                ts, m1_ts, m1_h, m1_l, has_1m, tf_minutes, use_htf, is_partial,
+                sl_buffer_pcts, rrs, rr1s, rr2s, be_after_tp1s, max_waits, risks,
+                initial_capital, maker_fee, taker_fee, max_lev, max_fvg_queue):
+    """
+    같은 가격/FVG/HTF 배열에 대해 파라미터 조합별로 _run_loop 를 prange 병렬 실행
+    Returns: (final_cap, n_trades, n_wins, max_dd) 조합별 배열
+      n_trades / n_wins 는 print_summary 와 같은 기준 (TP1 행 포함, 반올림 pnl > 0)
+    """
+    n_combos = len(risks)
+    final_cap = np.empty(n_combos)
+    n_trades = np.empty(n_combos, dtype=np.int64)
+    n_wins = np.empty(n_combos, dtype=np.int64)
+    max_dd = np.empty(n_combos)
+
+    for k in prange(n_combos):
+        trades, cap = _run_loop(
+            h, l, c, long_gap, short_gap, htf_close, htf_ema,
+            ts, m1_ts, m1_h, m1_l, has_1m, tf_minutes, use_htf, is_partial,
+            sl_buffer_pcts[k], rrs[k], rr1s[k], rr2s[k], be_after_tp1s[k], max_waits[k], risks[k],
+            initial_capital, maker_fee, taker_fee, max_lev, max_fvg_queue)
+        reason = trades[9]
+        pnl = trades[10]
+        balance = trades[11]
+
+        final_cap[k] = cap
+        n_trades[k] = len(pnl)
+        n_wins[k] = np.sum(np.round(pnl, 4) > 0)
+        max_dd[k] = calc_max_dd(balance, reason, initial_capital)
+
+    return final_cap, n_trades, n_wins, max_dd
+
+
+def _prepare_inputs(symbol, tf, version, min_fvg_pct, use_htf):
+    """
+    run_backtest / run_sweep 공통: 데이터 로드 후 커널 입력 배열 준비.
+    Returns: (ts, is_partial, data)
+      data: _run_loop / _sweep_loop 앞쪽 인자 튜플
+            (h, l, c, long_gap, short_gap, htf_close, htf_ema,
+             ts_ns, m1_ts, m1_h, m1_l, has_1m, tf_minutes, use_htf)
+    """
+    if use_htf is None:
+        use_htf = version in ('v6_htf', 'v6_1', 'v6_2', 'v7_partial')
+    is_partial = (version == 'v7_partial')
+
+    tf_minutes = int(tf.replace('m', ''))
+
+    df = load_data(symbol, tf)
+    h = df['high'].values.astype(np.float64)
+    l = df['low'].values.astype(np.float64)
+    c = df['close'].values.astype(np.float64)
+    ts = df['timestamp'].to_numpy()
+    n = len(c)
+
+    if use_htf:
+        htf_close, htf_ema = build_htf_arrays(df)
+    else:
+        htf_close = np.full(n, np.nan)
+        htf_ema = np.full(n, np.nan)
+
+    # 1m 데이터 로드 (없으면 None → 기존 방식 fallback)
+    bar1m = load_1m_data(symbol)
+    if bar1m is not None:
+        m1_ts = bar1m.index.to_numpy().astype('datetime64[ns]').view(np.int64)
+        m1_h = bar1m['high'].values.astype(np.float64)
+        m1_l = bar1m['low'].values.astype(np.float64)
+    else:
+        m1_ts = np.empty(0, dtype=np.int64)
+        m1_h = np.empty(0)
+        m1_l = np.empty(0)
+
+    long_gap, short_gap = find_fvgs(h, l, c, min_fvg_pct)
+
+    data = (h, l, c, long_gap, short_gap, htf_close, htf_ema,
+            ts.astype('datetime64[ns]').view(np.int64), m1_ts, m1_h, m1_l, bar1m is not None,
+            tf_minutes, use_htf)
+    return ts, is_partial, data
+
+
+def run_backtest(symbol, tf, version,
+                 sl_buffer_pct,
+                 rr=None, rr1=None, rr2=None, be_after_tp1=0,
+                 max_wait=20,
+                 risk_per_trade=0.02,
+                 min_fvg_pct=0.0,
+                 use_htf=None):
+    """
+    version: 'v2'/'v3'/'v4'/'v5' (no HTF, single TP)
+             'v6_htf'/'v6_1'/'v6_2' (HTF, single TP)
+             'v7_partial' (HTF, partial TP)
+
+    Returns: (trades, cap, max_dd)
+      trades: TRADE_DTYPE 레코드 배열 (거래 1건 = 1 레코드, t['pnl'] / trades['pnl'] 로 접근)
+    """
+    ts, is_partial, data = _prepare_inputs(symbol, tf, version, min_fvg_pct, use_htf)
+
+    (entry_idx, exit_idx, direction, entry_price, exit_price, take_profit, stop_loss,
+     leverage, size, reason, pnl, balance), cap = _run_loop(
+        *data, is_partial, sl_buffer_pct,
+        0.0 if rr is None else rr, 0.0 if rr1 is None else rr1, 0.0 if rr2 is None else rr2,
+        be_after_tp1, max_wait, risk_per_trade,
+        INITIAL_CAPITAL, MAKER_FEE, TAKER_FEE, MAX_LEV, MAX_FVG_QUEUE)
+    max_dd = calc_max_dd(balance, reason, INITIAL_CAPITAL)
+
+    # 커널의 컬럼 배열 → TRADE_DTYPE 레코드 배열 (round 는 기존과 같은 numpy 반올림)
+    trades = np.empty(len(pnl), dtype=TRADE_DTYPE)
+    trades['entry_time'] = ts[entry_idx]
+    trades['exit_time'] = ts[exit_idx]
+    trades['direction'] = np.where(direction == 1, 'LONG', 'SHORT')
+    trades['entry_price'] = entry_price
+    trades['exit_price'] = exit_price
+    trades['take_profit'] = take_profit
+    trades['stop_loss'] = stop_loss
+    trades['leverage'] = np.round(leverage, 2)
+    trades['size'] = np.round(size, 8)
+    trades['reason'] = REASON_NAMES[reason]
+    trades['pnl'] = np.round(pnl, 4)
+    trades['balance'] = np.round(balance, 4)
 
     return trades, cap, max_dd
 
 
+# run_sweep 의 grid 로 줄 수 있는 파라미터 (데이터/FVG/HTF 배열을 공유하는 커널 인자만)
+SWEEP_PARAMS = ('sl_buffer_pct', 'rr', 'rr1', 'rr2', 'be_after_tp1', 'max_wait', 'risk_per_trade')
+
+
+def run_sweep(symbol, tf, version, grid,
+              min_fvg_pct=0.0, use_htf=None, **base):
+    """
+    데이터 로드 / FVG / HTF / 1m 배열은 한 번만 준비하고 grid 의 모든 조합을
+    _sweep_loop 로 prange 병렬 실행 (run_backtest 를 조합 수만큼 반복하지 않음).
+
+    grid: {파라미터: 값 리스트} (SWEEP_PARAMS 만), grid 에 없는 파라미터는 base 또는
+          run_backtest 기본값 사용.
+    Returns: 조합별 결과 DataFrame (trades, wins, win_rate, max_dd, final_cap, return_pct)
+    """
+    unknown = (set(grid) | set(base)) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"run_sweep 은 {SWEEP_PARAMS} 만 지원: {sorted(unknown)}")
+
+    defaults = {'rr': None, 'rr1': None, 'rr2': None, 'be_after_tp1': 0,
+                'max_wait': 20, 'risk_per_trade': 0.02}
+    defaults.update(base)
+    keys = list(grid.keys())
+    combos = [{**defaults, **dict(zip(keys, values))} for values in itertools.product(*grid.values())]
+
+    def column(name, dtype=np.float64):
+        return np.array([0.0 if cb[name] is None else cb[name] for cb in combos], dtype=dtype)
+
+    _, is_partial, data = _prepare_inputs(symbol, tf, version, min_fvg_pct, use_htf)
+    final_cap, n_trades, n_wins, max_dd = _sweep_loop(
+        *data, is_partial,
+        column('sl_buffer_pct'), column('rr'), column('rr1'), column('rr2'),
+        column('be_after_tp1', np.int64), column('max_wait', np.int64), column('risk_per_trade'),
+        INITIAL_CAPITAL, MAKER_FEE, TAKER_FEE, MAX_LEV, MAX_FVG_QUEUE)
+
+    result = pd.DataFrame([{k: cb[k] for k in keys} for cb in combos])
+    result['trades'] = n_trades
+    result['wins'] = n_wins
+    result['win_rate'] = np.where(n_trades > 0, n_wins / np.maximum(n_trades, 1) * 100, 0.0)
+    result['max_dd'] = max_dd
+    result['final_cap'] = final_cap
+    result['return_pct'] = (final_cap / INITIAL_CAPITAL - 1) * 100
+    return result
+
+
 def save_trades(trades, filename):
-    if not trades:
+    if len(trades) == 0:
         print("No trades")
         return
-    df = pd.DataFrame(trades)
-    cols = ['entry_time', 'exit_time', 'direction', 'entry_price', 'exit_price',
-            'take_profit', 'stop_loss', 'leverage', 'size', 'reason', 'pnl', 'balance']
-    df[cols].to_csv(filename, index=False)
+    # TRADE_DTYPE 필드 순서가 곧 CSV 컬럼 순서
+    pd.DataFrame(trades).to_csv(filename, index=False)
 
 
 def print_summary(trades, cap, max_dd):
     tt = len(trades)
-    wins = [t for t in trades if t['pnl'] > 0]
-    longs = [t for t in trades if t['direction'] == 'LONG']
-    shorts = [t for t in trades if t['direction'] == 'SHORT']
-    liqs = [t for t in trades if t['reason'] == 'LIQ']
-    sls = [t for t in trades if t['reason'] == 'SL']
-    tps = [t for t in trades if t['reason'] in ('TP', 'TP1', 'TP2')]
+    wins = int((trades['pnl'] > 0).sum())
+    longs = int((trades['direction'] == 'LONG').sum())
+    shorts = tt - longs
+    liqs = int((trades['reason'] == 'LIQ').sum())
+    sls = int((trades['reason'] == 'SL').sum())
+    tps = int(np.isin(trades['reason'], ('TP', 'TP1', 'TP2')).sum())
 
     print(f"\n=== Summary ===")
     print(f"Total trades    : {tt}")
-    print(f"  LONG / SHORT  : {len(longs)} / {len(shorts)}")
-    print(f"Wins (pnl>0)    : {len(wins)}  WR: {len(wins)/tt*100 if tt>0 else 0:.2f}%")
-    print(f"SL  / TP(any)   : {len(sls)} / {len(tps)}")
-    print(f"LIQ             : {len(liqs)}")
+    print(f"  LONG / SHORT  : {longs} / {shorts}")
+    print(f"Wins (pnl>0)    : {wins}  WR: {wins/tt*100 if tt>0 else 0:.2f}%")
+    print(f"SL  / TP(any)   : {sls} / {tps}")
+    print(f"LIQ             : {liqs}")
     print(f"Max Drawdown    : {max_dd*100:.2f}%")
     print(f"Initial → Final : {INITIAL_CAPITAL:.2f} → {cap:.2f}")
     print(f"Return          : {(cap/INITIAL_CAPITAL-1)*100:+.2f}%")
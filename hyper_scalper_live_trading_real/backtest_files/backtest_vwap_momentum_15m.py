@@ -19,8 +19,14 @@ SHORT 진입 조건:
 - 익절: 진입가 - ATR * TP_ATR_MULT
 """
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
+import pyarrow.feather as feather
+from numba import njit, prange
 
 
 # ============================================
@@ -65,6 +71,24 @@ fee_protection = True
 START_DATE = '2019-01-05'
 END_DATE = '2026-02-20'
 
+# 파싱한 CSV 를 Arrow IPC(feather) 로 캐시, CSV 가 더 새로우면 다시 만듦
+DATA_CACHE_ENABLED = True
+
+# ============================================
+# 파라미터 스윕 설정
+# ============================================
+SWEEP_ENABLED = False   # True: SWEEP_GRID 의 모든 조합을 병렬로 실행 (거래 기록 없이 요약 지표만)
+# 'process': 조합마다 지표부터 다시 계산 (모든 파라미터 가능, ProcessPoolExecutor)
+# 'kernel' : 지표/신호는 한 번만 계산하고 커널만 prange 로 병렬 실행 (KERNEL_SWEEP_PARAMS 만 가능)
+SWEEP_MODE = 'process'
+SWEEP_WORKERS = None    # None = CPU 코어 수 ('process' 모드)
+SWEEP_GRID = {
+    'ADX_THRESHOLD': [28, 33, 38],
+    'TP_ATR_MULT_LONG': [6.6, 8.6],
+    'TP_ATR_MULT_SHORT': [6.6, 8.6],
+    'SL_LOOKBACK': [10, 20],
+}
+
 
 # ============================================
 # 지표 계산 함수
@@ -122,6 +146,217 @@ def calculate_daily_vwap(df):
     return df['vwap']
 
 
+# ============================================
+# Numba 시뮬레이션 커널
+# ============================================
+
+# 방향 / 청산 사유 코드 (커널과 거래 기록에서 int8 로 사용, 문자열은 DataFrame 구성 시에만)
+LONG, SHORT = 1, -1
+REASON_NONE, REASON_LIQ, REASON_SL, REASON_TP, REASON_END = -1, 0, 1, 2, 3
+REASON_NAMES = np.array(['LIQ', 'SL', 'TP', 'END'])
+
+
+@njit(cache=True)
+def _calc_leverage(entry_price, stop_loss, risk_per_trade, max_leverage, taker_fee):
+    sl_distance_pct = abs(entry_price - stop_loss) / entry_price
+    effective_sl = sl_distance_pct + taker_fee * 2
+    leverage = risk_per_trade / effective_sl
+    return round(max(1.0, min(leverage, max_leverage)), 2)
+
+
+@njit(cache=True)
+def _run_loop(high, low, close, atr, sl_low, sl_high, entry_dir, start_idx,
+              initial_capital, risk_per_trade, max_leverage, max_sl_distance,
+              tp_atr_mult_long, tp_atr_mult_short, fee_protection, maker_fee, taker_fee):
+    """
+    봉 단위 상태머신 (진입 → LIQ/SL/TP 청산), 포지션 상태는 로컬 스칼라로 유지
+    entry_dir: 봉별 진입 방향 (LONG/SHORT/0), direction / reason 은 int8 코드로 기록
+
+    Returns: (trades, capital)
+      trades: 컬럼별 배열 튜플 (entry_idx, exit_idx, direction, entry_price, exit_price,
+              take_profit, stop_loss, leverage, size, reason, pnl, balance)
+    """
+    n = len(close)
+
+    # 진입 다음 봉부터 청산되므로 거래 수는 최대 n // 2 + 1
+    max_trades = n // 2 + 1
+    tr_entry_idx = np.empty(max_trades, dtype=np.int64)
+    tr_exit_idx = np.empty(max_trades, dtype=np.int64)
+    tr_direction = np.empty(max_trades, dtype=np.int8)
+    tr_entry_price = np.empty(max_trades)
+    tr_exit_price = np.empty(max_trades)
+    tr_take_profit = np.empty(max_trades)
+    tr_stop_loss = np.empty(max_trades)
+    tr_leverage = np.empty(max_trades)
+    tr_size = np.empty(max_trades)
+    tr_reason = np.empty(max_trades, dtype=np.int8)
+    tr_pnl = np.empty(max_trades)
+    tr_balance = np.empty(max_trades)
+    n_trades = 0
+
+    capital = initial_capital
+
+    position = 0
+    entry_idx = 0
+    entry_price = 0.0
+    entry_size = 0.0
+    take_profit = 0.0
+    stop_loss = 0.0
+    leverage = 1.0
+    liq_p = 0.0
+
+    # 진입 신호가 있는 봉 인덱스: 무포지션 구간은 봉마다 보지 않고 다음 신호 봉으로 바로 건너뜀
+    entry_bars = np.flatnonzero(entry_dir)
+    n_entry_bars = len(entry_bars)
+    next_entry = 0
+
+    idx = start_idx - 1
+    while idx < n:
+        idx += 1
+        exit_price = 0.0
+        reason = REASON_NONE
+
+        if idx == n:
+            # 종료 시 열린 포지션은 마지막 close 로 청산
+            if position == 0:
+                break
+            exit_price = close[n - 1]
+            reason = REASON_END
+        elif position != 0:
+            # 청산가/SL/TP 는 진입 시 한 번만 계산해 두고 봉마다 비교만 함
+            # position(+1/-1) 를 부호로 써서 LONG/SHORT 를 한 경로로 판정
+            # adverse: 손실 방향 극값 (LONG=저가, SHORT=고가), favorable: 이익 방향 극값
+            if position == LONG:
+                adverse = low[idx]
+                favorable = high[idx]
+            else:
+                adverse = high[idx]
+                favorable = low[idx]
+
+            if position * adverse <= position * liq_p:
+                exit_price = liq_p
+                reason = REASON_LIQ
+            elif position * adverse <= position * stop_loss:
+                exit_price = stop_loss
+                reason = REASON_SL
+            elif position * favorable >= position * take_profit:
+                exit_price = take_profit
+                reason = REASON_TP
+        else:
+            while next_entry < n_entry_bars and entry_bars[next_entry] < idx:
+                next_entry += 1
+            if next_entry == n_entry_bars:
+                # 남은 진입 신호가 없으면 무포지션 그대로 종료
+                break
+            idx = entry_bars[next_entry]
+            position = entry_dir[idx]
+
+            entry_price = close[idx]
+            entry_idx = idx
+
+            # SL: N봉 최저/최고 (rolling 으로 미리 계산한 값), 진입가 반대편이면 0.1% 로 보정
+            stop_loss = sl_low[idx] if position == LONG else sl_high[idx]
+            if position * stop_loss >= position * entry_price:
+                stop_loss = entry_price * (1 - position * 0.001)
+
+            sl_distance = abs(entry_price - stop_loss) / entry_price
+            if sl_distance > max_sl_distance:
+                stop_loss = entry_price * (1 - position * max_sl_distance)
+
+            leverage = _calc_leverage(entry_price, stop_loss, risk_per_trade, max_leverage, taker_fee)
+            entry_size = capital * leverage / entry_price
+            liq_dist = 1.0 / leverage
+            liq_p = entry_price * (1 - position * liq_dist)
+
+            fee_offset = entry_price * (taker_fee * 2 + maker_fee) if fee_protection else 0.0
+            tp_atr_mult = tp_atr_mult_long if position == LONG else tp_atr_mult_short
+            take_profit = entry_price + position * atr[idx] * tp_atr_mult + position * fee_offset
+            continue
+
+        if reason == REASON_NONE:
+            continue
+
+        # 청산 실행
+        pnl = position * (exit_price - entry_price) * entry_size
+
+        e_fee = entry_price * entry_size * taker_fee
+        if reason == REASON_LIQ or reason == REASON_SL:
+            x_fee = exit_price * entry_size * taker_fee
+        else:
+            x_fee = exit_price * entry_size * maker_fee
+        net_pnl = pnl - e_fee - x_fee
+        capital += net_pnl
+
+        k = n_trades
+        tr_entry_idx[k] = entry_idx
+        tr_exit_idx[k] = min(idx, n - 1)
+        tr_direction[k] = position
+        tr_entry_price[k] = entry_price
+        tr_exit_price[k] = exit_price
+        tr_take_profit[k] = take_profit
+        tr_stop_loss[k] = stop_loss
+        tr_leverage[k] = leverage
+        tr_size[k] = entry_size
+        tr_reason[k] = reason
+        tr_pnl[k] = net_pnl
+        tr_balance[k] = capital
+        n_trades += 1
+        position = 0
+
+    k = n_trades
+    trades = (tr_entry_idx[:k], tr_exit_idx[:k], tr_direction[:k], tr_entry_price[:k],
+              tr_exit_price[:k], tr_take_profit[:k], tr_stop_loss[:k], tr_leverage[:k],
+              tr_size[:k], tr_reason[:k], tr_pnl[:k], tr_balance[:k])
+    return trades, capital
+
+
+@njit(cache=True)
+def calculate_mdd(balance: np.ndarray, initial_capital: float) -> float:
+    """거래별 잔고 기준 최대 낙폭 (시작 고점 = initial_capital). 결과 출력과 _sweep_loop 공용."""
+    peak = initial_capital
+    max_drawdown = 0.0
+    for b in balance:
+        if b > peak:
+            peak = b
+        drawdown = (peak - b) / peak
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+    return max_drawdown
+
+
+@njit(parallel=True, cache=True)
+def _sweep_loop(high, low, close, atr, sl_low, sl_high, entry_dir, start_idx,
+                risks, max_sl_distances, tp_atr_mults_long, tp_atr_mults_short,
+                initial_capital, max_leverage, fee_protection, maker_fee, taker_fee):
+    """
+    같은 가격/신호 배열에 대해 (risk, SL 캡, TP 배수) 조합별로 _run_loop 를 prange 병렬 실행
+    (거래 배열은 조합마다 커널 안에서 따로 할당, 입력 배열은 읽기 전용으로 공유)
+    Returns: (final_capital, total_pnl, n_trades, n_wins, mdd) 조합별 배열
+    """
+    n_combos = len(risks)
+    final_capital = np.empty(n_combos)
+    total_pnl = np.empty(n_combos)
+    n_trades = np.empty(n_combos, dtype=np.int64)
+    n_wins = np.empty(n_combos, dtype=np.int64)
+    mdd = np.empty(n_combos)
+
+    for c in prange(n_combos):
+        trades, capital = _run_loop(
+            high, low, close, atr, sl_low, sl_high, entry_dir, start_idx,
+            initial_capital, risks[c], max_leverage, max_sl_distances[c],
+            tp_atr_mults_long[c], tp_atr_mults_short[c], fee_protection, maker_fee, taker_fee)
+        pnl = trades[10]
+        balance = trades[11]
+
+        final_capital[c] = capital
+        total_pnl[c] = pnl.sum()
+        n_trades[c] = len(pnl)
+        n_wins[c] = np.sum(pnl > 0)
+        mdd[c] = calculate_mdd(balance, initial_capital)
+
+    return final_capital, total_pnl, n_trades, n_wins, mdd
+
+
 # ============================================
 # 백테스터 클래스
 # ============================================
@@ -130,16 +365,7 @@ class VWAPMomentumBacktester:
     def __init__(self, df: pd.DataFrame):
         self.df = df.copy()
         self.capital = INITIAL_CAPITAL
-        self.trades = []
-
-        self.position = None
-        self.entry_price = None
-        self.entry_time = None
-        self.entry_idx = None
-        self.entry_size = None
-        self.take_profit = None
-        self.stop_loss = None
-        self.leverage = None
+        self.trades = pd.DataFrame()
 
         self._calculate_indicators()
 
@@ -173,125 +399,56 @@ class VWAPMomentumBacktester:
         self.df['bull_trend'] = (self.df['close'] > self.df['vwap']) & (self.df['ema_fast'] > self.df['ema_slow'])
         self.df['bear_trend'] = (self.df['close'] < self.df['vwap']) & (self.df['ema_fast'] < self.df['ema_slow'])
 
-    def calculate_leverage(self, entry_price, stop_loss):
-        sl_distance_pct = abs(entry_price - stop_loss) / entry_price
-        effective_sl = sl_distance_pct + TAKER_FEE * 2
-        leverage = RISK_PER_TRADE / effective_sl
-        return round(max(1, min(leverage, MAX_LEVERAGE)), 2)
-
-    def execute_entry(self, idx, direction):
-        row = self.df.iloc[idx]
-        self.entry_price = row['close']
-        self.entry_time = row['timestamp']
-        self.entry_idx = idx
-        self.position = direction
-
-        # SL: N봉 최저/최고
-        lb_start = max(0, idx - SL_LOOKBACK)
-        lb_data = self.df.iloc[lb_start:idx + 1]
-
-        if direction == 'LONG':
-            self.stop_loss = lb_data['low'].min()
-            if self.stop_loss >= self.entry_price:
-                self.stop_loss = self.entry_price * (1 - 0.001)
-        else:
-            self.stop_loss = lb_data['high'].max()
-            if self.stop_loss <= self.entry_price:
-                self.stop_loss = self.entry_price * (1 + 0.001)
-
-        sl_distance = abs(self.entry_price - self.stop_loss) / self.entry_price
-        if sl_distance > MAX_SL_DISTANCE:
-            if direction == 'LONG':
-                self.stop_loss = self.entry_price * (1 - MAX_SL_DISTANCE)
-            else:
-                self.stop_loss = self.entry_price * (1 + MAX_SL_DISTANCE)
-
-        self.leverage = self.calculate_leverage(self.entry_price, self.stop_loss)
-        self.entry_size = self.capital * self.leverage / self.entry_price
-
-        fee_offset = self.entry_price * (TAKER_FEE * 2 + MAKER_FEE) if fee_protection else 0
-        if direction == 'LONG':
-            self.take_profit = self.entry_price + row['atr'] * TP_ATR_MULT_LONG + fee_offset
-        else:
-            self.take_profit = self.entry_price - row['atr'] * TP_ATR_MULT_SHORT - fee_offset
-
-    def check_exit(self, idx):
-        row = self.df.iloc[idx]
-        liq_dist = 1.0 / self.leverage
-
-        if self.position == 'LONG':
-            liq_p = self.entry_price * (1 - liq_dist)
-            if row['low'] <= liq_p: return True, liq_p, 'LIQ'
-            if row['low'] <= self.stop_loss: return True, self.stop_loss, 'SL'
-            if row['high'] >= self.take_profit: return True, self.take_profit, 'TP'
-        else:
-            liq_p = self.entry_price * (1 + liq_dist)
-            if row['high'] >= liq_p: return True, liq_p, 'LIQ'
-            if row['high'] >= self.stop_loss: return True, self.stop_loss, 'SL'
-            if row['low'] <= self.take_profit: return True, self.take_profit, 'TP'
-        return False, None, None
-
-    def execute_exit(self, exit_price, reason):
-        if self.position == 'LONG':
-            pnl = (exit_price - self.entry_price) * self.entry_size
-        else:
-            pnl = (self.entry_price - exit_price) * self.entry_size
-
-        e_fee = self.entry_price * self.entry_size * TAKER_FEE
-        x_fee = exit_price * self.entry_size * (TAKER_FEE if reason in ['SL', 'LIQ'] else MAKER_FEE)
-        net_pnl = pnl - e_fee - x_fee
-        self.capital += net_pnl
-        return {'exit_price': exit_price, 'pnl': net_pnl}
-
-    def close_position(self, result, idx, reason):
-        row = self.df.iloc[idx]
-        self.trades.append({
-            'entry_time': self.entry_time, 'exit_time': row['timestamp'],
-            'direction': self.position, 'entry_price': self.entry_price,
-            'exit_price': result['exit_price'], 'take_profit': self.take_profit,
-            'stop_loss': self.stop_loss, 'leverage': self.leverage,
-            'size': self.entry_size, 'reason': reason,
-            'pnl': result['pnl'], 'balance': self.capital
+        # SL lookback: 진입마다 윈도우를 슬라이스하지 않고 rolling min/max 로 한 번에 계산
+        self.df['sl_low'] = self.df['low'].rolling(window=SL_LOOKBACK + 1, min_periods=1).min()
+        self.df['sl_high'] = self.df['high'].rolling(window=SL_LOOKBACK + 1, min_periods=1).max()
+
+    def _kernel_inputs(self) -> tuple:
+        """커널 입력: (가격/지표 배열 리스트, 진입 방향 배열)"""
+        # 봉마다 df.iloc 로 행 Series 를 만들지 않고, 컬럼 배열을 Numba 커널에 한 번에 넘김
+        cols = ['high', 'low', 'close', 'atr', 'sl_low', 'sl_high']
+        arrays = [self.df[c].to_numpy(dtype=np.float64) for c in cols]
+
+        # 진입 조건 (지표 준비 + ADX + 추세/MACD 교차) 을 봉별 진입 방향 int8 배열로 미리 계산
+        # (NaN 이 섞인 비교는 False 라서 ADX 준비 전 구간은 자동으로 제외됨)
+        tradable = (self.df['atr'].notna() & self.df['vwap'].notna() & self.df['macd_hist'].notna()
+                    & (self.df['adx'] >= ADX_THRESHOLD)).to_numpy(dtype=bool)
+        long_entry = (tradable & (self.df['bull_trend'] & self.df['macd_long_cross']).to_numpy(dtype=bool)
+                      & (TRADE_DIRECTION in ['BOTH', 'LONG']))
+        short_entry = (tradable & (self.df['bear_trend'] & self.df['macd_short_cross']).to_numpy(dtype=bool)
+                       & (TRADE_DIRECTION in ['BOTH', 'SHORT']))
+        entry_dir = np.where(long_entry, LONG, np.where(short_entry, SHORT, 0)).astype(np.int8)
+        return arrays, entry_dir
+
+    def run(self, verbose: bool = True):
+        # verbose=False: 로그/결과 출력 없이 거래 기록만 생성 (스윕 등 반복 실행용)
+        if verbose:
+            print(f"Starting backtest with {len(self.df)} candles")
+            print(f"VWAP Momentum: Daily VWAP + EMA{EMA_FAST}/{EMA_SLOW} + MACD({MACD_FAST},{MACD_SLOW},{MACD_SIGNAL}) + ADX>={ADX_THRESHOLD}")
+            print(f"SL: {SL_LOOKBACK}봉 lookback, TP: ATR*{TP_ATR_MULT_LONG}, RISK: {RISK_PER_TRADE*100}%")
+            print("-" * 60)
+
+        arrays, entry_dir = self._kernel_inputs()
+        trades, self.capital = _run_loop(
+            *arrays, entry_dir, SL_LOOKBACK + 1,
+            INITIAL_CAPITAL, RISK_PER_TRADE, float(MAX_LEVERAGE), MAX_SL_DISTANCE,
+            float(TP_ATR_MULT_LONG), float(TP_ATR_MULT_SHORT), bool(fee_protection), MAKER_FEE, TAKER_FEE)
+
+        # 거래 기록: 행 dict 를 쌓지 않고 커널의 컬럼 배열로 DataFrame 을 한 번에 구성
+        (entry_idx, exit_idx, direction, entry_price, exit_price, take_profit,
+         stop_loss, leverage, size, reason, pnl, balance) = trades
+        ts_values = self.df['timestamp'].to_numpy()
+        self.trades = pd.DataFrame({
+            'entry_time': ts_values[entry_idx], 'exit_time': ts_values[exit_idx],
+            'direction': np.where(direction == LONG, 'LONG', 'SHORT'), 'entry_price': entry_price,
+            'exit_price': exit_price, 'take_profit': take_profit,
+            'stop_loss': stop_loss, 'leverage': leverage,
+            'size': size, 'reason': REASON_NAMES[reason],
+            'pnl': pnl, 'balance': balance
         })
-        self.position = self.entry_price = self.entry_time = None
-        self.entry_idx = self.entry_size = self.take_profit = None
-        self.stop_loss = self.leverage = None
-
-    def run(self):
-        print(f"Starting backtest with {len(self.df)} candles")
-        print(f"VWAP Momentum: Daily VWAP + EMA{EMA_FAST}/{EMA_SLOW} + MACD({MACD_FAST},{MACD_SLOW},{MACD_SIGNAL}) + ADX>={ADX_THRESHOLD}")
-        print(f"SL: {SL_LOOKBACK}봉 lookback, TP: ATR*{TP_ATR_MULT_LONG}, RISK: {RISK_PER_TRADE*100}%")
-        print("-" * 60)
-
-        for idx in range(SL_LOOKBACK + 1, len(self.df)):
-            row = self.df.iloc[idx]
-
-            if self.position is not None:
-                if idx <= self.entry_idx:
-                    continue
-                should_exit, exit_price, reason = self.check_exit(idx)
-                if should_exit:
-                    result = self.execute_exit(exit_price, reason)
-                    self.close_position(result, idx, reason)
-                    continue
-            else:
-                if pd.isna(row['atr']) or pd.isna(row['vwap']) or pd.isna(row['macd_hist']):
-                    continue
-                if pd.isna(row['adx']) or row['adx'] < ADX_THRESHOLD:
-                    continue
-
-                if row['bull_trend'] and row['macd_long_cross']:
-                    if TRADE_DIRECTION in ['BOTH', 'LONG']:
-                        self.execute_entry(idx, 'LONG')
-                elif row['bear_trend'] and row['macd_short_cross']:
-                    if TRADE_DIRECTION in ['BOTH', 'SHORT']:
-                        self.execute_entry(idx, 'SHORT')
-
-        if self.position is not None:
-            result = self.execute_exit(self.df.iloc[-1]['close'], 'END')
-            self.close_position(result, len(self.df) - 1, 'END')
-
-        self._print_results()
+
+        if verbose:
+            self._print_results()
         return self.trades
 
     def _print_results(self):
@@ -299,64 +456,181 @@ class VWAPMomentumBacktester:
         print("BACKTEST RESULTS - VWAP Momentum + ADX Filter")
         print("=" * 60)
 
-        total = len(self.trades)
-        wins = [t for t in self.trades if t['pnl'] > 0]
-        long_t = [t for t in self.trades if t['direction'] == 'LONG']
-        short_t = [t for t in self.trades if t['direction'] == 'SHORT']
-        liqs = [t for t in self.trades if t['reason'] == 'LIQ']
-        tps = [t for t in self.trades if t['reason'] == 'TP']
-        sls = [t for t in self.trades if t['reason'] == 'SL']
+        trades = self.trades
+        total = len(trades)
+        pnl = trades['pnl'].to_numpy()
+        win_mask = pnl > 0
+        long_mask = (trades['direction'] == 'LONG').to_numpy()
+        reason_counts = trades['reason'].value_counts()
+        n_wins = int(win_mask.sum())
 
         print(f"Total Trades: {total}")
-        print(f"  Long: {len(long_t)} (Win: {len([t for t in long_t if t['pnl']>0])})")
-        print(f"  Short: {len(short_t)} (Win: {len([t for t in short_t if t['pnl']>0])})")
-        print(f"  TP: {len(tps)} | SL: {len(sls)} | LIQ: {len(liqs)}")
+        print(f"  Long: {int(long_mask.sum())} (Win: {int((long_mask & win_mask).sum())})")
+        print(f"  Short: {int((~long_mask).sum())} (Win: {int((~long_mask & win_mask).sum())})")
+        print(f"  TP: {int(reason_counts.get('TP', 0))} | SL: {int(reason_counts.get('SL', 0))} | LIQ: {int(reason_counts.get('LIQ', 0))}")
         if total > 0:
-            print(f"Win Rate: {len(wins)/total*100:.2f}%")
-            avg_win = np.mean([t['pnl'] for t in wins]) if wins else 0
-            avg_loss = np.mean([t['pnl'] for t in self.trades if t['pnl'] <= 0]) if len(self.trades) > len(wins) else 0
+            print(f"Win Rate: {n_wins/total*100:.2f}%")
+            avg_win = np.mean(pnl[win_mask]) if n_wins else 0
+            avg_loss = np.mean(pnl[~win_mask]) if total > n_wins else 0
             print(f"Avg Win: {avg_win:.2f} USDT | Avg Loss: {avg_loss:.2f} USDT")
             if avg_loss != 0:
-                print(f"Profit Factor: {abs(avg_win * len(wins)) / abs(avg_loss * (total - len(wins))):.2f}")
-            peak = INITIAL_CAPITAL
-            mdd = 0
-            for t in self.trades:
-                if t['balance'] > peak: peak = t['balance']
-                dd = (peak - t['balance']) / peak
-                if dd > mdd: mdd = dd
+                print(f"Profit Factor: {abs(avg_win * n_wins) / abs(avg_loss * (total - n_wins)):.2f}")
+            mdd = calculate_mdd(trades['balance'].to_numpy(), INITIAL_CAPITAL)
             print(f"MDD: {mdd*100:.2f}%")
-        print(f"Total PnL: {sum(t['pnl'] for t in self.trades):.2f} USDT")
+        print(f"Total PnL: {sum(pnl.tolist()):.2f} USDT")
         print(f"Final Capital: {self.capital:.2f} USDT")
         print(f"Return: {(self.capital/INITIAL_CAPITAL-1)*100:.2f}%")
 
     def save_trades(self, filename):
-        if self.trades:
-            pd.DataFrame(self.trades).to_csv(filename, index=False)
+        if not self.trades.empty:
+            self.trades.to_csv(filename, index=False)
             print(f"Trades saved to {filename}")
 
 
 # ============================================
-# 메인
+# 데이터 로드
 # ============================================
-if __name__ == "__main__":
+
+def load_data(path: str, start_date: str = START_DATE, end_date: str = END_DATE) -> pd.DataFrame:
     print("Loading data...")
-    df = pd.read_csv('historical_data/BTCUSDT_15m_raw.csv')
-    df.columns = df.columns.str.lower()
-    if 'timestamp' not in df.columns and 'open_time' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
-    elif 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    # 컬럼명 소문자화 / timestamp 변환까지 끝낸 데이터를 feather 캐시 (임시 파일에 쓴 뒤 os.replace)
+    cache_path = os.path.splitext(path)[0] + '.feather'
+    if (DATA_CACHE_ENABLED and os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+        df = feather.read_table(cache_path, memory_map=True).to_pandas()
+    else:
+        df = pd.read_csv(path, engine='pyarrow')
+        df.columns = df.columns.str.lower()
+        if 'timestamp' not in df.columns and 'open_time' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
+        elif 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if DATA_CACHE_ENABLED:
+            tmp_path = cache_path + '.tmp'
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, cache_path)
 
     first_real = df.index[(df['high'] != df['low'])][0] if (df['high'] != df['low']).any() else 0
     if first_real > 0:
         print(f"Skipping {first_real} dummy rows")
         df = df.iloc[first_real:].reset_index(drop=True)
 
-    df = df[(df['timestamp'] >= START_DATE) & (df['timestamp'] <= END_DATE)]
-    df = df.reset_index(drop=True)
-    print(f"Data: {len(df)} candles ({START_DATE} ~ {END_DATE})")
+    # timestamp 는 오름차순 → 비교 마스크 대신 이진 탐색으로 구간 경계를 찾아 슬라이스
+    ts = df['timestamp'].to_numpy()
+    lo = np.searchsorted(ts, np.datetime64(start_date), side='left')
+    hi = np.searchsorted(ts, np.datetime64(end_date), side='right')
+    df = df.iloc[lo:hi].reset_index(drop=True)
+    print(f"Data: {len(df)} candles ({start_date} ~ {end_date})")
+    return df
+
+
+# ============================================
+# 파라미터 스윕
+# ============================================
+
+# 워커 프로세스별 OHLCV (initializer 로 워커당 한 번만 전달받음, 작업마다 pickle 하지 않음)
+_sweep_df = None
+
+
+def _init_sweep_worker(df: pd.DataFrame):
+    global _sweep_df
+    _sweep_df = df
+
+
+def run_one(params: dict) -> dict:
+    """파라미터 조합 하나를 출력 없이 실행하고 요약 지표만 반환 (스윕 워커)"""
+    # 파라미터는 모듈 상수로 참조하므로 워커 프로세스의 전역값을 덮어씀
+    globals().update(params)
+
+    bt = VWAPMomentumBacktester(_sweep_df)
+    trades = bt.run(verbose=False)
+
+    total = len(trades)
+    pnl = trades['pnl'].to_numpy()
+    wins = int(np.count_nonzero(pnl > 0))
+    return {
+        **params,
+        'trades': total,
+        'win_rate': wins / total * 100 if total > 0 else 0.0,
+        'total_pnl': pnl.sum(),
+        'final_capital': bt.capital,
+        'return_pct': (bt.capital / INITIAL_CAPITAL - 1) * 100,
+        'mdd_pct': calculate_mdd(trades['balance'].to_numpy(), INITIAL_CAPITAL) * 100,
+    }
+
+
+def run_sweep(grid: dict, df: pd.DataFrame, max_workers: int = None) -> pd.DataFrame:
+    """grid 의 모든 조합을 ProcessPoolExecutor 로 병렬 실행 (조합끼리는 서로 독립)"""
+    # run_one 이 grid 키로 모듈 전역을 덮어쓰므로 기존 설정 상수가 아닌 키(오타 등)는 미리 거부
+    unknown = [k for k in grid if not isinstance(globals().get(k), (bool, int, float, str))]
+    if unknown:
+        raise ValueError(f"스윕은 모듈 설정 상수만 지원: {sorted(unknown)}")
+
+    keys = list(grid.keys())
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    print(f"Sweep: {len(combos)} combinations")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                             initargs=(df,)) as executor:
+        results = list(executor.map(run_one, combos))
+
+    return pd.DataFrame(results).sort_values('return_pct', ascending=False).reset_index(drop=True)
+
+
+# 'kernel' 스윕에서 바꿀 수 있는 파라미터 (지표/신호 계산에 영향 없는 것만)
+KERNEL_SWEEP_PARAMS = ('RISK_PER_TRADE', 'MAX_SL_DISTANCE', 'TP_ATR_MULT_LONG', 'TP_ATR_MULT_SHORT')
+
+
+def run_kernel_sweep(grid: dict, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    지표/진입 신호는 한 번만 계산하고 커널만 조합 수만큼 prange 로 병렬 실행
+    프로세스 생성/pickle 비용이 없어 TP/리스크처럼 커널 파라미터만 바꾸는 스윕에 유리
+    """
+    unknown = set(grid) - set(KERNEL_SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"kernel 스윕은 {KERNEL_SWEEP_PARAMS} 만 지원: {sorted(unknown)}")
+
+    keys = list(grid.keys())
+    combos = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    print(f"Kernel sweep: {len(combos)} combinations")
+
+    def column(name, default):
+        return np.array([c.get(name, default) for c in combos], dtype=np.float64)
 
     bt = VWAPMomentumBacktester(df)
-    bt.run()
-    bt.save_trades('trades_vwap_momentum_15m.csv')
+    arrays, entry_dir = bt._kernel_inputs()
+    final_capital, total_pnl, n_trades, n_wins, mdd = _sweep_loop(
+        *arrays, entry_dir, SL_LOOKBACK + 1,
+        column('RISK_PER_TRADE', RISK_PER_TRADE), column('MAX_SL_DISTANCE', MAX_SL_DISTANCE),
+        column('TP_ATR_MULT_LONG', TP_ATR_MULT_LONG), column('TP_ATR_MULT_SHORT', TP_ATR_MULT_SHORT),
+        INITIAL_CAPITAL, float(MAX_LEVERAGE), bool(fee_protection), MAKER_FEE, TAKER_FEE)
+
+    results = pd.DataFrame(combos)
+    results['trades'] = n_trades
+    results['win_rate'] = np.where(n_trades > 0, n_wins / np.maximum(n_trades, 1) * 100, 0.0)
+    results['total_pnl'] = total_pnl
+    results['final_capital'] = final_capital
+    results['return_pct'] = (final_capital / INITIAL_CAPITAL - 1) * 100
+    results['mdd_pct'] = mdd * 100
+    return results.sort_values('return_pct', ascending=False).reset_index(drop=True)
+
+
+# ============================================
+# 메인
+# ============================================
+if __name__ == "__main__":
+    df = load_data('historical_data/BTCUSDT_15m_raw.csv')
+
+    if SWEEP_ENABLED:
+        if SWEEP_MODE == 'kernel':
+            results = run_kernel_sweep(SWEEP_GRID, df)
+        else:
+            results = run_sweep(SWEEP_GRID, df, max_workers=SWEEP_WORKERS)
+        print(results.to_string())
+        results.to_csv('sweep_vwap_momentum_15m.csv', index=False)
+        print("Sweep results saved to sweep_vwap_momentum_15m.csv")
+    else:
+        bt = VWAPMomentumBacktester(df)
+        bt.run()
+        bt.save_trades('trades_vwap_momentum_15m.csv')
 